@@ -0,0 +1,230 @@
+import threading
+from pipeline import get_price_packages, get_crowd_sentiments
+from utils.lazy import lazy_import
+from utils.tickers import clean_tickers
+from utils.jsonfile import read_json, write_json_atomic
+
+np = lazy_import("numpy")
+
+ABOVE, BELOW, MOVE, SENTIMENT = range(4)
+KINDS = {"ABOVE": ABOVE, "BELOW": BELOW, "MOVE": MOVE, "SENTIMENT": SENTIMENT}
+KIND_NAMES = {v: k for k, v in KINDS.items()}
+# Fewer bull+bear votes than this in a window and its bull share is not trusted
+MIN_SENTIMENT_VOTES = 5
+
+HELP = (
+    "Watchlist & alerts:\n"
+    "WATCH AAPL MSFT – alert on big daily moves\n"
+    "UNWATCH AAPL – stop watching (removes its alerts)\n"
+    "WATCHLIST – show watched symbols\n"
+    "ALERT AAPL ABOVE 200 / BELOW 150 – price crosses\n"
+    "ALERT AAPL MOVE 5 – daily move of 5% or more\n"
+    "ALERT AAPL SENTIMENT 20 – 24h bull share 20 pts off its 7d level\n"
+    "ALERTS – list alerts, UNALERT <id> – remove one"
+)
+
+
+def _number(v):
+    return float(v) if isinstance(v, (int, float)) else np.nan
+
+def _bull_share(window):
+    votes = window["bull"] + window["bear"]
+    return 100.0 * window["bull"] / votes if votes >= MIN_SENTIMENT_VOTES else np.nan
+
+def _swing(crowd):
+    windows = (crowd or {}).get("windows")
+    if not windows:
+        return np.nan
+    return _bull_share(windows["24h"]) - _bull_share(windows["7d"])
+
+
+class AlertBook:
+    """
+    Per-chat watchlists and threshold rules, checked together by a scheduled job.
+    Rules are compiled into arrays once per change; each check makes one batched
+    quote request for every watched symbol (plus sentiment for the symbols that
+    have sentiment rules) and evaluates all rules in a single vectorized pass.
+    A rule fires when its condition becomes true and re-arms once it is false.
+    """
+
+    def __init__(self, path=None, default_move=5.0, max_rules_per_chat=50):
+        self.path = path
+        self.default_move = default_move
+        self.max_rules_per_chat = max_rules_per_chat
+        self._lock = threading.Lock()
+        self._rules = {}  # id -> [chat_id, symbol, kind, threshold, armed]
+        self._next_id = 1
+        self._compiled = None
+        if path:
+            data = read_json(path)
+            for rule_id, rule in (data.get("rules") or {}).items():
+                self._rules[int(rule_id)] = rule
+            self._next_id = data.get("next_id", max(self._rules, default=0) + 1)
+
+    # ---------- Rules ----------
+    def add(self, chat_id, symbol, kind, threshold):
+        with self._lock:
+            if sum(1 for r in self._rules.values() if r[0] == chat_id) >= self.max_rules_per_chat:
+                return None
+            rule_id = self._next_id
+            self._next_id += 1
+            self._rules[rule_id] = [chat_id, symbol, kind, float(threshold), True]
+            self._compiled = None
+        self.save()
+        return rule_id
+
+    def remove(self, chat_id, rule_id=None, symbol=None):
+        with self._lock:
+            doomed = [i for i, r in self._rules.items()
+                      if r[0] == chat_id and (i == rule_id or r[1] == symbol)]
+            for i in doomed:
+                del self._rules[i]
+            self._compiled = None
+        if doomed:
+            self.save()
+        return len(doomed)
+
+    def rules(self, chat_id):
+        with self._lock:
+            return sorted((i, r) for i, r in self._rules.items() if r[0] == chat_id)
+
+    def watchlist(self, chat_id):
+        return sorted({r[1] for _, r in self.rules(chat_id)})
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"next_id": self._next_id, "rules": {str(i): list(r) for i, r in self._rules.items()}}
+        try:
+            write_json_atomic(self.path, data)
+        except Exception as e:
+            print("Saving alerts failed:", e)
+
+    # ---------- Evaluation ----------
+    def _compile(self):
+        if self._compiled is None:
+            ids = sorted(self._rules)
+            rules = [self._rules[i] for i in ids]
+            symbols = sorted({r[1] for r in rules})
+            index = {s: n for n, s in enumerate(symbols)}
+            self._compiled = (
+                symbols, np.array(ids, dtype=np.int64),
+                np.array([index[r[1]] for r in rules], dtype=np.int64),
+                np.array([r[2] for r in rules], dtype=np.int8),
+                np.array([r[3] for r in rules], dtype=float),
+                np.array([r[4] for r in rules], dtype=bool),
+            )
+        return self._compiled
+
+    def evaluate(self):
+        """Checks every rule once. Returns {chat_id: [alert text, ...]} for the rules that fired."""
+        with self._lock:
+            if not self._rules:
+                return {}
+            compiled = self._compile()
+            symbols, ids, sym, kind, threshold, armed = compiled
+            armed = armed.copy()
+
+        quotes = get_price_packages(symbols)
+        price = np.array([_number(q.get("price")) for q in quotes])
+        move = np.array([_number(q.get("pct_1d")) for q in quotes])
+        swing = np.full(len(symbols), np.nan)
+        wanted = np.unique(sym[kind == SENTIMENT])
+        if len(wanted):
+            crowds = get_crowd_sentiments([symbols[i] for i in wanted])
+            swing[wanted] = [_swing(c) for c in crowds]
+
+        # One metric per rule, picked by kind; NaN (no data) never fires
+        metric = np.select(
+            [kind <= BELOW, kind == MOVE],
+            [price[sym], np.abs(move[sym])],
+            np.abs(swing[sym]),
+        )
+        known = ~np.isnan(metric)
+        with np.errstate(invalid="ignore"):
+            hit = np.where(kind == BELOW, metric <= threshold, metric >= threshold) & known
+        fired = hit & armed
+        new_armed = np.where(known, ~hit, armed)
+        changed = np.flatnonzero(new_armed != armed).tolist()
+
+        out = {}
+        with self._lock:
+            if self._compiled is compiled:
+                compiled[5][:] = new_armed
+            for n in changed:
+                rule = self._rules.get(int(ids[n]))
+                if rule is not None:
+                    rule[4] = bool(new_armed[n])
+            for n in np.flatnonzero(fired).tolist():
+                rule = self._rules.get(int(ids[n]))
+                if rule is not None:
+                    s = sym[n]
+                    text = _describe(rule, price[s], move[s], swing[s])
+                    out.setdefault(rule[0], []).append(text)
+        if changed:
+            self.save()
+        return out
+
+    # ---------- Commands ----------
+    def handle(self, text, chat_id):
+        """Replies to a watchlist/alert command, or returns None if `text` is not one."""
+        words = text.upper().split()
+        if not words:
+            return None
+        cmd, args = words[0], words[1:]
+        if cmd == "WATCH" and args:
+            symbols = clean_tickers(args, strict=False)
+            if not symbols:
+                return "❌ No valid tickers found."
+            added = [s for s in symbols if self.add(chat_id, s, MOVE, self.default_move)]
+            return f"👀 Watching {', '.join(added)} (alert on moves of {self.default_move:g}% or more)." if added \
+                else "⚠ Alert limit reached."
+        if cmd == "UNWATCH" and args:
+            removed = sum(self.remove(chat_id, symbol=s) for s in args)
+            return f"Removed {', '.join(args)} ({removed} alerts)."
+        if cmd == "WATCHLIST":
+            symbols = self.watchlist(chat_id)
+            return "👀 Watching: " + ", ".join(symbols) if symbols else "Your watchlist is empty.\n\n" + HELP
+        if cmd == "ALERT":
+            if len(args) != 3 or args[1] not in KINDS or not clean_tickers(args[:1], strict=False):
+                return HELP
+            try:
+                threshold = float(args[2].rstrip("%"))
+            except ValueError:
+                return HELP
+            rule = [chat_id, args[0], KINDS[args[1]], threshold, True]
+            rule_id = self.add(*rule[:4])
+            if rule_id is None:
+                return "⚠ Alert limit reached."
+            return f"🔔 Alert #{rule_id}: {_rule_text(rule)}"
+        if cmd == "ALERTS":
+            rules = self.rules(chat_id)
+            if not rules:
+                return "No alerts set.\n\n" + HELP
+            return "\n".join(f"#{i} {_rule_text(r)}" for i, r in rules)
+        if cmd == "UNALERT" and len(args) == 1 and args[0].lstrip("#").isdigit():
+            removed = self.remove(chat_id, rule_id=int(args[0].lstrip("#")))
+            return "Alert removed." if removed else "No such alert."
+        return None
+
+
+def _rule_text(rule):
+    _, symbol, kind, threshold, _ = rule
+    if kind == ABOVE:
+        return f"{symbol} above {threshold:g}"
+    if kind == BELOW:
+        return f"{symbol} below {threshold:g}"
+    if kind == MOVE:
+        return f"{symbol} moves {threshold:g}% in a day"
+    return f"{symbol} sentiment swings {threshold:g} pts"
+
+def _describe(rule, price, move, swing):
+    _, symbol, kind, threshold, _ = rule
+    if kind in (ABOVE, BELOW):
+        side = "above" if kind == ABOVE else "below"
+        return f"🔔 {symbol} is {side} {threshold:g}: now {price:.2f}"
+    if kind == MOVE:
+        return f"🔔 {symbol} moved {move:+.2f}% today (price {price:.2f})"
+    mood = "bullish" if swing > 0 else "bearish"
+    return f"🔔 {symbol} sentiment swung {swing:+.0f} pts {mood} vs its 7-day level"
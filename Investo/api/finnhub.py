@@ -1,8 +1,16 @@
-import requests
+import time
 from datetime import datetime, timedelta
+from config import NEWS_MAX_PER_FEED, NEWS_MAX_FEEDS, NEWS_SIMHASH_DISTANCE
+from utils.cache import ttl_for
+from utils.circuit import ProviderUnavailable
+from utils.http_client import http_get
+from utils.metrics import timed
+from utils.news_store import NewsStore
 
 FINNHUB_API_KEY = None
-HTTP_TIMEOUT = 12
+GENERAL_FEED = "general"
+
+_news = NewsStore(max_items=NEWS_MAX_PER_FEED, max_feeds=NEWS_MAX_FEEDS, max_distance=NEWS_SIMHASH_DISTANCE)
 
 def set_api_key(key):
     global FINNHUB_API_KEY
@@ -15,36 +23,32 @@ def finnhub_get(path, params):
         url = f"https://finnhub.io/api/v1/{path}"
         p = dict(params or {})
         p["token"] = FINNHUB_API_KEY
-        r = requests.get(url, params=p, timeout=HTTP_TIMEOUT)
+        r = http_get(url, params=p)
         if r.ok:
             return r.json()
     except Exception:
         return None
     return None
 
+@timed("finnhub.company_news")
 def get_company_news(symbol, days=7, max_items=5):
-    end = datetime.now().date()
-    start = end - timedelta(days=days)
-    js = finnhub_get("company-news", {"symbol": symbol, "from": str(start), "to": str(end)})
-    if not js: return []
-    seen = set()
-    out = []
-    for item in sorted(js, key=lambda x: x.get("datetime", 0), reverse=True):
-        h = item.get("headline", "").strip()
-        if not h or h in seen: continue
-        seen.add(h)
-        out.append(h[:150])
-        if len(out) >= max_items: break
-    return out
+    """Newest distinct headlines from the last `days` days, from the news store."""
+    def fetch(max_ts, max_id):
+        end = datetime.now().date()
+        # The API filters by date only, so the watermark's day is asked for again
+        start = datetime.fromtimestamp(max_ts).date() if max_ts else end - timedelta(days=days)
+        return finnhub_get("company-news", {"symbol": symbol, "from": str(start), "to": str(end)})
+
+    if not _news.refresh(symbol, fetch, ttl_for("company_news")):
+        raise ProviderUnavailable(f"no news for {symbol}")
+    since = time.time() - days * 86400
+    return [h[:150] for h in _news.headlines(symbol, max_items, since=since)]
 
+@timed("finnhub.global_news")
 def get_global_news(max_items=6):
-    js = finnhub_get("news", {"category": "general"})
-    if not js: return []
-    seen, out = set(), []
-    for item in js:
-        h = item.get("headline", "").strip()
-        if not h or h in seen: continue
-        seen.add(h)
-        out.append(h[:150])
-        if len(out) >= max_items: break
-    return out
\ No newline at end of file
+    # minId makes Finnhub return only items newer than the last one we stored
+    fetch = lambda max_ts, max_id: finnhub_get(
+        "news", {"category": "general", **({"minId": max_id} if max_id else {})}
+    )
+    _news.refresh(GENERAL_FEED, fetch, ttl_for("global_news"))
+    return [h[:150] for h in _news.headlines(GENERAL_FEED, max_items)]
@@ -1,18 +1,50 @@
-import requests
+import atexit
+from config import SENTIMENT_STORE_PATH, SENTIMENT_REFRESH_SECONDS, SENTIMENT_MAX_SYMBOLS, STOCKTWITS_MAX_PAGES
+from utils.circuit import ProviderUnavailable
+from utils.http_client import http_get
+from utils.metrics import timed
+from utils.sentiment_store import SentimentTracker
 
-HTTP_TIMEOUT = 12
+STREAM_URL = "https://api.stocktwits.com/api/2/streams/symbol/{symbol}.json"
+EMPTY = {"mentions": 0, "bull": 0, "bear": 0}
 
-def get_crowd_sentiment(symbol, max_items=100):
+_tracker = SentimentTracker(SENTIMENT_STORE_PATH, max_symbols=SENTIMENT_MAX_SYMBOLS)
+atexit.register(_tracker.flush)
+
+def fetch_messages(symbol, since=None, max_pages=STOCKTWITS_MAX_PAGES):
+    """
+    Stream messages newer than message id `since` (the latest page if None),
+    paging back with `max` while the API reports more. None on failure.
+    """
+    messages, params = [], {"since": since} if since else {}
     try:
-        url = f"https://api.stocktwits.com/api/2/streams/symbol/{symbol}.json"
-        r = requests.get(url, timeout=HTTP_TIMEOUT)
-        if not r.ok: return {"mentions": 0, "bull": 0, "bear": 0}
-        msgs = r.json().get("messages", [])[:max_items]
-        bull = bear = 0
-        for m in msgs:
-            s = (m.get("entities") or {}).get("sentiment") or {}
-            if s.get("basic") == "Bullish": bull += 1
-            if s.get("basic") == "Bearish": bear += 1
-        return {"mentions": len(msgs), "bull": bull, "bear": bear}
+        for _ in range(max_pages):
+            r = http_get(STREAM_URL.format(symbol=symbol), params=params)
+            if not r.ok:
+                return messages or None
+            js = r.json()
+            page = js.get("messages", [])
+            messages.extend(page)
+            cursor = js.get("cursor") or {}
+            if since is None or not page or not cursor.get("more"):
+                break
+            oldest = min(m.get("id", 0) for m in page)
+            if oldest <= since + 1:
+                break
+            params = {"since": since, "max": oldest - 1}
     except Exception:
-        return {"mentions": 0, "bull": 0, "bear": 0}
\ No newline at end of file
+        return messages or None
+    return messages
+
+@timed("stocktwits.sentiment")
+def get_crowd_sentiment(symbol):
+    """
+    Mentions and bull/bear counts over the last 24h, with the 1h/24h/7d windows
+    under "windows". Only messages not seen before are fetched, and nothing is
+    fetched while the counts are younger than SENTIMENT_REFRESH_SECONDS.
+    Raises ProviderUnavailable if nothing was ever fetched for `symbol`.
+    """
+    windows = _tracker.get(symbol, lambda since: fetch_messages(symbol, since), SENTIMENT_REFRESH_SECONDS)
+    if windows is None:
+        raise ProviderUnavailable(f"no sentiment for {symbol}")
+    return dict(windows["24h"], windows=windows)
@@ -1,39 +1,102 @@
-import requests
 import re
-from bs4 import BeautifulSoup
+import threading
 from collections import Counter
+from functools import lru_cache
+from utils.cache import cached
+from utils.http_client import http_get
+from utils.lazy import lazy_import
+from utils.metrics import timed
+from utils.tickers import get_universe
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (InvestmentBot/1.0)"}
-HTTP_TIMEOUT = 12
+MOST_ACTIVE_URL = "https://finance.yahoo.com/most-active"
+HOME_URL = "https://finance.yahoo.com/"
 
+bs4 = lazy_import("bs4")
+
+# Only these elements are built into a tree; the rest of the page is skipped
+TABLE_ONLY = ("table",)
+HEADLINES_ONLY = ("h2", "h3", "a")
+
+@lru_cache(maxsize=None)
+def parser():
+    # lxml parses several times faster than html.parser on the Pi, if it is installed
+    return "lxml" if bs4.builder.builder_registry.lookup("lxml") else "html.parser"
+
+@lru_cache(maxsize=None)
+def strainer(tags):
+    return bs4.SoupStrainer(list(tags))
+
+def _soup(html, tags):
+    return bs4.BeautifulSoup(html, parser(), parse_only=strainer(tags))
+
+# url -> {"etag", "last_modified", "tickers"} for conditional requests
+_validators = {}
+_validators_lock = threading.Lock()
+
+def parse_most_active(html):
+    """All tickers from the first table, in page order."""
+    soup = _soup(html, TABLE_ONLY)
+    tickers = []
+    table = soup.find("table")
+    if table:
+        for row in table.find_all("tr")[1:]:
+            td = row.find("td")
+            if td is not None:
+                t = td.get_text().strip()
+                if t and re.fullmatch(r"[A-Z.\-]{1,10}", t):
+                    tickers.append(t)
+    return list(dict.fromkeys(tickers))
+
+def parse_mentions(html):
+    """Tickers mentioned in headlines and links, most mentioned first."""
+    soup = _soup(html, HEADLINES_ONLY)
+    headlines = [h.get_text(" ", strip=True) for h in soup.find_all(["h2", "h3", "a"])]
+    text = " ".join(headlines)
+    universe = get_universe()
+    if universe is not None:
+        # Known symbols only, also counting company names and $cashtags
+        counter = Counter(universe.extract_mentions(text))
+    else:
+        counter = Counter(re.findall(r"\b[A-Z]{1,5}\b", text))
+    return [t for t, _ in counter.most_common()]
+
+def _fetch_tickers(url, parse):
+    """
+    Fetches `url` with If-None-Match / If-Modified-Since; on 304 the tickers
+    parsed from the previous response are reused without downloading or parsing.
+    """
+    with _validators_lock:
+        prev = _validators.get(url)
+    headers = dict(HEADERS)
+    if prev:
+        if prev.get("etag"):
+            headers["If-None-Match"] = prev["etag"]
+        if prev.get("last_modified"):
+            headers["If-Modified-Since"] = prev["last_modified"]
+
+    r = http_get(url, headers=headers)
+    if r.status_code == 304 and prev:
+        return prev["tickers"]
+    tickers = parse(r.text)
+    etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    if r.ok and (etag or last_modified):
+        with _validators_lock:
+            _validators[url] = {"etag": etag, "last_modified": last_modified, "tickers": tickers}
+    return tickers
+
+@timed("yahoo.most_active")
+@cached("trending")
 def get_top_volume_tickers(count=5):
-    url = "https://finance.yahoo.com/most-active"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=HTTP_TIMEOUT)
-        soup = BeautifulSoup(r.text, "html.parser")
-        tickers = []
-        table = soup.find("table")
-        if table:
-            rows = table.find_all("tr")[1:]
-            for row in rows[: count * 4]:
-                tds = row.find_all("td")
-                if len(tds) > 0:
-                    t = tds[0].text.strip()
-                    if t and re.fullmatch(r"[A-Z.\-]{1,10}", t):
-                        tickers.append(t)
-        return list(dict.fromkeys(tickers))[:count]
+        return _fetch_tickers(MOST_ACTIVE_URL, parse_most_active)[:count]
     except Exception:
         return []
 
+@timed("yahoo.mentions")
+@cached("trending")
 def get_most_mentioned_tickers(count=5):
-    url = "https://finance.yahoo.com/"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=HTTP_TIMEOUT)
-        soup = BeautifulSoup(r.text, "html.parser")
-        headlines = [h.get_text(" ", strip=True) for h in soup.find_all(["h2", "h3", "a"])]
-        candidates = re.findall(r"\b[A-Z]{1,5}\b", " ".join(headlines))
-        counter = Counter(candidates)
-        tickers = [t for t, _ in counter.most_common(count * 6)]
-        return list(dict.fromkeys(tickers))[:count]
+        return _fetch_tickers(HOME_URL, parse_mentions)[:count]
     except Exception:
-        return []
\ No newline at end of file
+        return []
@@ -1,32 +1,275 @@
-import yfinance as yf
+import threading
+from datetime import date
+from config import PRICE_STORE_PATH, PRICE_HISTORY_DAYS, HTTP_TIMEOUT
+from utils.cache import cached, get_cache, make_key, ttl_for
+from utils.circuit import ProviderUnavailable, get_breaker
+from utils.deadline import budget
+from utils.lazy import lazy_import
+from utils.metrics import timed
+from utils.price_store import PriceStore
 
-def get_stock_data_yf(symbol):
-    data = {
+# Adjusted closes are rewritten after splits/dividends; a stored close that
+# moved by more than this means the symbol's history must be refetched
+ADJUSTMENT_TOLERANCE = 0.005
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+yf = lazy_import("yfinance")
+
+# Opened on first price request rather than at import
+_store = None
+_store_opened = False
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store, _store_opened
+    with _store_lock:
+        if not _store_opened:
+            _store_opened = True
+            if PRICE_STORE_PATH:
+                try:
+                    _store = PriceStore(PRICE_STORE_PATH, retention_days=PRICE_HISTORY_DAYS)
+                except Exception as e:
+                    print("Price store unavailable, using direct downloads:", e)
+        return _store
+
+def _empty_price(symbol):
+    return {
         "symbol": symbol,
         "price": "N/A",
         "pct_1d": "N/A",
         "pct_5d": "N/A",
         "pct_1m": "N/A",
-        "shortName": symbol,
-        "summary": "",
+        "pct_3m": "N/A",
+        "pct_ytd": "N/A",
     }
+
+def _pct(last, base):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.round((last - base) / base * 100, 2)
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+def _value(v):
+    return "N/A" if np.isnan(v) else float(v)
+
+def _changes_from_closes(closes, symbols):
+    """
+    Computes price and 1d/5d/1m/3m/YTD changes for every column of a
+    (days x symbols) close frame in one pass. Each column's valid closes are
+    packed to the top, so symbols with gaps or shorter histories are handled
+    without a Python loop. 3m and YTD stay "N/A" unless the frame reaches back
+    far enough (the one-month download does not; the price store does).
+    """
+    closes = closes.reindex(columns=symbols)
+    arr = closes.to_numpy(dtype=float)
+    rows, cols = arr.shape
+    if rows == 0:
+        return [_empty_price(s) for s in symbols]
+    mask = ~np.isnan(arr)
+    n = mask.sum(axis=0)
+    rank = np.cumsum(mask, axis=0) - 1
+    packed = np.full_like(arr, np.nan)
+    col_idx = np.broadcast_to(np.arange(cols), arr.shape)
+    packed[rank[mask], col_idx[mask]] = arr[mask]
+
+    col = np.arange(cols)
+    pick = lambda r: packed[np.clip(r, 0, rows - 1), col]
+    last = pick(n - 1)
+    prev = np.where(n > 1, pick(n - 2), last)
+    week = np.where(n > 5, pick(n - 6), pick(np.zeros_like(n)))
+
+    dates = closes.index
+    end = dates[-1]
+    nan = np.full(cols, np.nan)
+
+    first_valid = dates[mask.argmax(axis=0)]
+
+    def first_since(cutoff, need_coverage=True):
+        # First valid close on/after `cutoff`, per column; NaN where the
+        # column's history starts too late to cover the window
+        sub = arr[np.asarray(dates >= cutoff)]
+        if not len(sub):
+            return nan
+        valid = ~np.isnan(sub)
+        out = np.where(valid.any(axis=0), sub[valid.argmax(axis=0), col], np.nan)
+        if need_coverage:
+            out[np.asarray(first_valid > cutoff + pd.Timedelta(days=7))] = np.nan
+        return out
+
+    def last_before(cutoff):
+        # Last valid close strictly before `cutoff`, per column
+        sub = arr[np.asarray(dates < cutoff)][::-1]
+        if not len(sub):
+            return nan
+        valid = ~np.isnan(sub)
+        return np.where(valid.any(axis=0), sub[valid.argmax(axis=0), col], np.nan)
+
+    if isinstance(dates, pd.DatetimeIndex):
+        month = first_since(end - pd.DateOffset(months=1), need_coverage=False)
+        quarter = first_since(end - pd.DateOffset(months=3))
+        year_start = last_before(pd.Timestamp(year=end.year, month=1, day=1, tz=end.tz))
+    else:
+        month, quarter, year_start = pick(np.zeros_like(n)), nan, nan
+
+    price = np.round(last, 2)
+    pct_1d, pct_5d, pct_1m = _pct(last, prev), _pct(last, week), _pct(last, month)
+    pct_3m, pct_ytd = _pct(last, quarter), _pct(last, year_start)
+    out = []
+    for j, s in enumerate(symbols):
+        d = _empty_price(s)
+        if n[j]:
+            d["price"] = _value(price[j])
+            d["pct_1d"] = _value(pct_1d[j])
+            d["pct_5d"] = _value(pct_5d[j])
+            d["pct_1m"] = _value(pct_1m[j])
+            d["pct_3m"] = _value(pct_3m[j])
+            d["pct_ytd"] = _value(pct_ytd[j])
+        out.append(d)
+    return out
+
+def _download(symbols, **kwargs):
+    # Behind the yfinance circuit breaker, with the timeout cut to the request deadline;
+    # only a failure within the full timeout counts against yfinance
+    breaker = get_breaker("yfinance")
+    timeout = budget(HTTP_TIMEOUT)
+    breaker.before()
+    try:
+        frame = yf.download(
+            symbols, group_by="column", auto_adjust=True, progress=False,
+            threads=False, multi_level_index=True, timeout=timeout, **kwargs
+        )
+    except Exception:
+        if timeout < HTTP_TIMEOUT:
+            breaker.inconclusive()
+        else:
+            breaker.failure()
+        raise
+    breaker.success()
+    return frame
+
+def _download_changes(symbols):
+    try:
+        frame = _download(symbols, period="1mo")
+        if frame is None or frame.empty:
+            return [_empty_price(s) for s in symbols]
+        return _changes_from_closes(frame["Close"], symbols)
+    except Exception:
+        return [_empty_price(s) for s in symbols]
+
+def _download_bars(symbols, start):
+    frame = _download(symbols, start=str(start))
+    out = {}
+    if frame is None or frame.empty:
+        return out
+    for s in symbols:
+        try:
+            bars = frame.xs(s, axis=1, level=1).dropna(subset=["Close"])
+        except KeyError:
+            continue
+        if not bars.empty:
+            out[s] = bars
+    return out
+
+def _sync_store(symbols):
+    """
+    Fetches only the bars from each symbol's last completed stored session on.
+    That session's close is compared with the fresh one to catch splits and
+    dividends; today's bar is still moving, so it is stored unchecked.
+    Returns the symbols that got fresh bars.
+    """
+    last = _store.last_days(symbols, before=str(date.today()))
+    groups = {}
+    for s in symbols:
+        groups.setdefault(last.get(s) or str(_store.first_day_to_fetch()), []).append(s)
+
+    refetch, synced = [], set()
+    for start, group in groups.items():
+        for s, bars in _download_bars(group, start).items():
+            synced.add(s)
+            if s in last:
+                stored = _store.close_on(s, last[s])
+                fresh = bars["Close"].get(pd.Timestamp(last[s]))
+                if stored and fresh is not None and abs(fresh - stored) / stored > ADJUSTMENT_TOLERANCE:
+                    refetch.append(s)
+                    continue
+            _store.upsert(s, bars)
+    if refetch:
+        for s in refetch:
+            _store.drop(s)
+        refetched = _download_bars(refetch, _store.first_day_to_fetch())
+        for s, bars in refetched.items():
+            _store.upsert(s, bars)
+        synced -= set(refetch) - set(refetched)
+    _store.prune()
+    return synced
+
+def _store_changes(symbols):
+    try:
+        synced = _sync_store(symbols)
+        fresh = [s for s in symbols if s in synced]
+        out = dict(zip(fresh, _changes_from_closes(_store.closes(fresh), fresh))) if fresh else {}
+    except Exception:
+        return _download_changes(symbols)
+    # Nothing new came back for these (a quiet download failure): stored closes
+    # would pass for current prices, so they go through the quote path instead
+    stale = [s for s in symbols if s not in out]
+    if stale:
+        out.update((d["symbol"], d) for d in _download_changes(stale))
+    return [out[s] for s in symbols]
+
+@timed("yfinance.batch")
+def get_stock_data_batch(symbols):
+    """
+    Price and 1d/5d/1m/3m/YTD changes for all symbols. Fresh quotes come from
+    the cache; the rest are fetched together in one grouped download, which
+    with the price store only covers bars newer than what is stored.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    cache = get_cache()
+    found, missing = {}, []
+    for s in symbols:
+        hit, value = cache.get("quote", make_key("quote", s))
+        if hit:
+            found[s] = value
+        else:
+            missing.append(s)
+
+    if missing:
+        fetch = _store_changes if get_store() is not None else _download_changes
+        for d in fetch(missing):
+            found[d["symbol"]] = d
+            if d["price"] != "N/A":
+                cache.set("quote", make_key("quote", d["symbol"]), d, ttl_for("quote"))
+    return [dict(found[s]) for s in symbols]
+
+def get_stock_price_yf(symbol):
+    return get_stock_data_batch([symbol])[0]
+
+def _fetch_info(symbol):
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        data["shortName"] = info.get("shortName", symbol)
-        data["summary"] = (info.get("longBusinessSummary") or "")[:400]
-        hist = ticker.history(period="1mo")
-        if not hist.empty:
-            closes = hist["Close"].tolist()
-            last = float(closes[-1])
-            prev = float(closes[-2]) if len(closes) > 1 else last
-            week = float(closes[-6]) if len(closes) > 5 else closes[0]
-            month = closes[0]
-            pct = lambda a, b: round(((a - b) / b) * 100, 2) if b else "N/A"
-            data["price"] = round(last, 2)
-            data["pct_1d"] = pct(last, prev)
-            data["pct_5d"] = pct(last, week)
-            data["pct_1m"] = pct(last, month)
+        info = get_breaker("yfinance.info").call(lambda: yf.Ticker(symbol).info)
+        return {
+            "shortName": info.get("shortName", symbol),
+            "summary": (info.get("longBusinessSummary") or "")[:400],
+        }
     except Exception:
-        pass
-    return data
\ No newline at end of file
+        return None  # failures are not cached; counted by get_stock_info_yf's span
+
+# shortName / business summary almost never change, so they get the long "profile" TTL
+_cached_info = cached("profile")(_fetch_info)
+
+@timed("yfinance.info")
+def get_stock_info_yf(symbol):
+    data = _cached_info(symbol)
+    if not data:
+        raise ProviderUnavailable(f"no profile for {symbol}")
+    return dict(data)
+
+def get_stock_data_yf(symbol):
+    data = get_stock_price_yf(symbol)
+    try:
+        data.update(get_stock_info_yf(symbol))
+    except ProviderUnavailable:
+        data.update(shortName=symbol, summary="")
+    return data
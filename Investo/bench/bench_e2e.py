@@ -0,0 +1,161 @@
+"""
+End-to-end benchmark: drives telegram_handler.message_handler offline against
+the replay harness and reports wall-clock latency, per-stage and per-provider
+timings, upstream call counts and peak RSS.
+
+    python bench/bench_e2e.py                       # SUMMARY + multi-ticker, no latency
+    python bench/bench_e2e.py --profile pi          # simulated Raspberry Pi upstream latencies
+    python bench/bench_e2e.py --profile degraded --scenario SUMMARY --repeat 3
+    python bench/bench_e2e.py --latency stocktwits=5 --latency yahoo=2
+    python bench/bench_e2e.py --profile pi --chats 6  # six chats at once through the chat queue
+    python bench/bench_e2e.py --record              # refresh HTTP fixtures from the network
+
+Runs are cold (caches cleared) unless --warm is given.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import time
+
+import replay  # must come first: redirects caches and ledger before the bot modules load
+from replay import STATS, Stats, fake_context, fake_update
+
+import pipeline
+import summarizer
+from api.yahoo import get_top_volume_tickers, get_most_mentioned_tickers
+from config import CHAT_CONCURRENCY, MAX_QUEUED_MESSAGES
+from telegram_handler import enqueue_message, message_handler
+from utils.chat_queue import ChatQueue
+from utils.tickers import clean_tickers
+
+STAGES = Stats()
+
+def timed(name, fn):
+    def wrapper(*args, **kwargs):
+        t = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            STAGES.add(name, time.perf_counter() - t)
+    return wrapper
+
+HANDLER_DEPS = dict(
+    startup_warnings=[],
+    get_top_volume_tickers=timed("trending", get_top_volume_tickers),
+    get_most_mentioned_tickers=timed("trending", get_most_mentioned_tickers),
+    clean_tickers=clean_tickers,
+    get_stock_package=timed("packages", pipeline.get_stock_package),
+    summarize_stocks=timed("summarize", summarizer.summarize_stocks),
+    get_stock_packages=timed("packages", pipeline.get_stock_packages),
+    build_summary_packages=timed("packages", pipeline.build_summary_packages),
+    summarize_tickers=timed("summarize", summarizer.summarize_tickers),
+)
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_once(text, bot_data):
+    update = fake_update(text)
+    ctx = fake_context(bot_data)
+    start = time.perf_counter()
+    asyncio.run(message_handler(update, ctx, **HANDLER_DEPS))
+    wall = time.perf_counter() - start
+    sent = update.message.sent
+    return {
+        "wall_s": wall,
+        "first_reply_s": (sent[0][2] - start) if sent else None,
+        "messages": sum(1 for kind, _, _ in sent if kind == "send"),
+        "edits": sum(1 for kind, _, _ in sent if kind == "edit"),
+    }
+
+def run_chats(text, chats, bot_data):
+    """The same message from `chats` chats at once, dispatched like start_bot does."""
+    async def go():
+        loop = asyncio.get_running_loop()
+        queue = ChatQueue(max_active=CHAT_CONCURRENCY, max_pending=MAX_QUEUED_MESSAGES)
+        ctx = fake_context(bot_data)
+        updates, done = [], []
+        for i in range(chats):
+            update, finished = fake_update(text, chat_id=i + 1), loop.create_future()
+
+            async def job(update=update, finished=finished):
+                try:
+                    await message_handler(update, ctx, **HANDLER_DEPS)
+                finally:
+                    finished.set_result(None)
+
+            if await enqueue_message(update, queue, job) is None:
+                finished.set_result(None)
+            updates.append(update)
+            done.append(finished)
+        await asyncio.gather(*done)
+        return updates
+
+    start = time.perf_counter()
+    updates = asyncio.run(go())
+    finished = sorted(u.message.sent[-1][2] - start for u in updates if u.message.sent)
+    return {
+        "wall_s": time.perf_counter() - start,
+        "chat_done_median_s": finished[len(finished) // 2] if finished else None,
+        "chat_done_max_s": finished[-1] if finished else None,
+        "messages": sum(1 for u in updates for kind, _, _ in u.message.sent if kind == "send"),
+        "edits": sum(1 for u in updates for kind, _, _ in u.message.sent if kind == "edit"),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--profile", default="fast", choices=sorted(replay.PROFILES))
+    ap.add_argument("--latency", action="append", default=[], metavar="PROVIDER=SECONDS",
+                    help="override one provider's injected latency")
+    ap.add_argument("--scenario", action="append", metavar="TEXT",
+                    help="message text to send (default: SUMMARY and 'AAPL MSFT NVDA AMD')")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--warm", action="store_true", help="keep caches between runs")
+    ap.add_argument("--record", action="store_true", help="hit the real upstreams and save HTTP fixtures")
+    ap.add_argument("--chats", type=int, default=1, help="send each scenario from this many chats at once")
+    ap.add_argument("--json", action="store_true", help="print one JSON object per run")
+    args = ap.parse_args()
+
+    profile = dict(replay.PROFILES[args.profile])
+    for item in args.latency:
+        name, _, seconds = item.partition("=")
+        profile[name] = float(seconds)
+    replay.set_profile(profile)
+    replay.install(record=args.record)
+
+    scenarios = args.scenario or ["SUMMARY", "AAPL MSFT NVDA AMD"]
+    bot_data = {"tokens_used": 0, "primary_budget": 1_000_000}
+    for text in scenarios:
+        for i in range(args.repeat):
+            if not args.warm:
+                replay.reset_caches()
+            STATS.reset()
+            STAGES.reset()
+            result = run_once(text, bot_data) if args.chats == 1 else run_chats(text, args.chats, bot_data)
+            result.update({
+                "scenario": text, "run": i + 1, "profile": args.profile,
+                "stages_s": {k: round(v, 3) for k, v in STAGES.seconds.items()},
+                "upstream_calls": dict(STATS.calls),
+                "upstream_s": {k: round(v, 3) for k, v in STATS.seconds.items()},
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+            })
+            if args.json:
+                print(json.dumps(result))
+                continue
+            if args.chats == 1:
+                latency = f"first reply {result['first_reply_s']:.2f}s"
+            else:
+                latency = (f"{args.chats} chats done median {result['chat_done_median_s']:.2f}s "
+                           f"/ max {result['chat_done_max_s']:.2f}s")
+            print(f"[{text}] run {i + 1} ({args.profile}): wall {result['wall_s']:.2f}s, "
+                  f"{latency}, {result['messages']} msgs / {result['edits']} edits, "
+                  f"peak RSS {result['peak_rss_mb']} MB")
+            for name, secs in sorted(result["stages_s"].items()):
+                print(f"    stage {name:16s} {secs:7.3f}s")
+            for name in sorted(result["upstream_calls"]):
+                print(f"    {name:22s} {result['upstream_calls'][name]:4d} calls {result['upstream_s'][name]:7.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Startup benchmark: how long `import main` takes in a fresh interpreter (what
+every restart pays before polling can begin), with lazy and eager imports, and
+how much of it is deferred to the background warm-up.
+
+    python bench/bench_startup.py                  # median of 5 runs per mode
+    python bench/bench_startup.py --top 15         # also list the slowest imports
+    python bench/bench_startup.py --budget 0.8     # exit 1 if lazy startup exceeds 0.8s
+
+Each run is a new process, so the numbers include the interpreter's own start.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROBE = """
+import sys, time
+t = time.perf_counter()
+import main
+ready = time.perf_counter() - t
+print("--ready--", file=sys.stderr)
+t = time.perf_counter()
+main.warm_up()
+print(ready, time.perf_counter() - t)
+"""
+
+def run(lazy, importtime=False):
+    env = dict(os.environ, LAZY_IMPORTS=str(int(lazy)), METRICS_PORT="0",
+               CACHE_DB_PATH="", PRICE_STORE_PATH="", OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "bench"))
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE]
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    ready, warm = map(float, proc.stdout.strip().splitlines()[-1].split())
+    return ready, warm, proc.stderr
+
+def slowest_imports(stderr, top):
+    # "import time: self [us] | cumulative | <2 spaces per level>module";
+    # keep what main imports directly, up to the point it is ready
+    rows = []
+    for line in stderr.split("--ready--")[0].splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if len(name) - len(name.lstrip()) <= 3:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=0, help="show the N slowest imports (lazy mode)")
+    ap.add_argument("--budget", type=float, help="fail if the lazy-mode median exceeds this many seconds")
+    args = ap.parse_args()
+
+    results = {}
+    for lazy in (True, False):
+        runs = [run(lazy) for _ in range(args.repeat)]
+        ready = statistics.median(r[0] for r in runs)
+        warm = statistics.median(r[1] for r in runs)
+        results[lazy] = ready
+        label = "lazy" if lazy else "eager"
+        print(f"{label:5s}  import main {ready:6.3f}s   deferred to warm-up {warm:6.3f}s   (median of {args.repeat})")
+    print(f"startup speedup x {results[False] / results[True]:.1f}")
+
+    if args.top:
+        print("slowest imports at startup (lazy), cumulative:")
+        for us, name in slowest_imports(run(True, importtime=True)[2], args.top):
+            print(f"  {us / 1000:8.1f} ms  {name}")
+
+    if args.budget is not None and results[True] > args.budget:
+        print(f"FAIL: lazy startup {results[True]:.3f}s exceeds budget {args.budget:.3f}s")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
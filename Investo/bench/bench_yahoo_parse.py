@@ -0,0 +1,74 @@
+"""
+Parse-time benchmark for the Yahoo scrapers, run against the saved fixtures.
+
+    python bench/bench_yahoo_parse.py [--repeat N]
+
+Compares the old approach (full document tree, html.parser) with the
+targeted SoupStrainer parse on each available backend, and checks that every
+variant extracts the same tickers.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+from api.yahoo import TABLE_ONLY, HEADLINES_ONLY, strainer as only
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_most_active(html, parser, strainer=None):
+    soup = BeautifulSoup(html, parser, parse_only=strainer)
+    tickers = []
+    table = soup.find("table")
+    if table:
+        for row in table.find_all("tr")[1:]:
+            tds = row.find_all("td")
+            if tds:
+                t = tds[0].text.strip()
+                if t and re.fullmatch(r"[A-Z.\-]{1,10}", t):
+                    tickers.append(t)
+    return list(dict.fromkeys(tickers))
+
+def legacy_mentions(html, parser, strainer=None):
+    soup = BeautifulSoup(html, parser, parse_only=strainer)
+    headlines = [h.get_text(" ", strip=True) for h in soup.find_all(["h2", "h3", "a"])]
+    counter = Counter(re.findall(r"\b[A-Z]{1,5}\b", " ".join(headlines)))
+    return [t for t, _ in counter.most_common()]
+
+def timed(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    parsers = [p for p in ("html.parser", "lxml") if builder_registry.lookup(p)]
+    cases = [
+        ("yahoo_most_active.html", legacy_most_active, only(TABLE_ONLY)),
+        ("yahoo_home.html", legacy_mentions, only(HEADLINES_ONLY)),
+    ]
+    for name, fn, strainer in cases:
+        html = open(os.path.join(FIXTURES, name), encoding="utf-8").read()
+        print(f"{name} ({len(html) / 1024:.0f} KiB), best of {args.repeat}:")
+        baseline_ms, baseline = timed(lambda: fn(html, "html.parser"), args.repeat)
+        print(f"  {'full tree / html.parser':28s} {baseline_ms:8.1f} ms")
+        for parser in parsers:
+            ms, result = timed(lambda: fn(html, parser, strainer), args.repeat)
+            same = "ok" if result[:30] == baseline[:30] else "MISMATCH"
+            print(f"  {'targeted / ' + parser:28s} {ms:8.1f} ms  x{baseline_ms / ms:4.1f}  {same}")
+
+if __name__ == "__main__":
+    main()
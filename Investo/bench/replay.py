@@ -0,0 +1,360 @@
+"""
+Record/replay harness: serves every upstream the bot talks to from local
+fixtures, with optional injected latency per provider, and counts calls.
+
+HTTP providers (Finnhub, StockTwits, Yahoo pages) are replayed at the
+transport level by mounting a requests adapter on the shared session in
+utils/http_client.py, so the real provider code, cache and rate limiter run.
+yfinance, OpenAI and Telegram are replaced with in-process stand-ins.
+
+Import this module before anything from the bot: it points the response
+cache, price store and token ledger at throwaway locations.
+"""
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "fixtures")
+REPLAY_DIR = os.path.join(FIXTURES, "replay")
+RECORDED_DIR = os.path.join(REPLAY_DIR, "recorded")
+sys.path.insert(0, os.path.dirname(HERE))
+
+_tmp = tempfile.mkdtemp(prefix="investo-bench-")
+os.environ["CACHE_DB_PATH"] = ""
+os.environ["PRICE_STORE_PATH"] = ""
+os.environ["SENTIMENT_STORE_PATH"] = ""
+os.environ.setdefault("SNAPSHOT_REFRESH_SECONDS", "0")
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+import utils.token_persistence as token_persistence
+from utils.jsonfile import write_json_atomic
+token_persistence.DATA_PATH = os.path.join(_tmp, "token_data.json")
+# Plenty of budget, so replies are never scaled down for a low balance
+write_json_atomic(token_persistence.DATA_PATH, {"primary_budget": 10_000_000})
+
+# Seconds of injected latency per provider call
+PROFILES = {
+    "fast": {},
+    "pi": {
+        "yahoo": 0.6, "finnhub": 0.25, "stocktwits": 0.4, "yfinance": 0.8,
+        "yfinance_info": 0.5, "openai": 2.0, "telegram": 0.12,
+    },
+    "degraded": {
+        "yahoo": 3.0, "finnhub": 0.25, "stocktwits": 6.0, "yfinance": 0.8,
+        "yfinance_info": 0.5, "openai": 2.0, "telegram": 0.12,
+    },
+}
+
+HOST_PROVIDER = {
+    "finnhub.io": "finnhub",
+    "api.stocktwits.com": "stocktwits",
+    "finance.yahoo.com": "yahoo",
+}
+
+
+class Stats:
+    """Call counts and cumulative time per provider/stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.calls[name] += 1
+            self.seconds[name] += seconds
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.seconds.clear()
+
+
+STATS = Stats()
+_profile = {}
+
+def set_profile(name_or_dict):
+    global _profile
+    _profile = PROFILES[name_or_dict] if isinstance(name_or_dict, str) else dict(name_or_dict)
+
+def _delay(provider, timeout=None):
+    # A latency past the caller's timeout behaves like a hung upstream: it times out
+    start = time.perf_counter()
+    seconds = _profile.get(provider, 0)
+    if isinstance(timeout, (int, float)) and seconds > timeout:
+        time.sleep(timeout)
+        STATS.add(provider, time.perf_counter() - start)
+        raise requests.Timeout(f"{provider} timed out after {timeout:.1f}s")
+    if seconds:
+        time.sleep(seconds)
+    return start
+
+# ---------- HTTP (transport level) ----------
+
+def _fixture_key(req):
+    parts = urlsplit(req.url)
+    symbol = _symbol_of(req.url)
+    return f"{parts.hostname}{parts.path}".replace("/", "_") + (f"_{symbol}" if symbol else "")
+
+def _symbol_of(url):
+    m = re.search(r"[?&]symbol=([A-Z.\-]+)", url) or re.search(r"/symbol/([A-Z.\-]+)\.json", url)
+    return m.group(1) if m else None
+
+def _template(name, symbol):
+    with open(os.path.join(REPLAY_DIR, name), encoding="utf-8") as f:
+        text = f.read()
+    return json.dumps(_recent(json.loads(text.replace("{symbol}", symbol or ""))))
+
+def _recent(data):
+    """Shifts fixture timestamps so the newest item is a minute old, like a live feed's."""
+    items = data if isinstance(data, list) else data.get("messages", [])
+    if items and "datetime" in items[0]:
+        shift = time.time() - 60 - max(i["datetime"] for i in items)
+        for i in items:
+            i["datetime"] = int(i["datetime"] + shift)
+    elif items and "created_at" in items[0]:
+        parse = lambda v: datetime.fromisoformat(v.replace("Z", "+00:00"))
+        shift = datetime.now(timezone.utc) - timedelta(minutes=1) - max(parse(i["created_at"]) for i in items)
+        for i in items:
+            i["created_at"] = (parse(i["created_at"]) + shift).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return data
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers requests from recorded responses, falling back to templated fixtures."""
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).hostname
+        provider = HOST_PROVIDER.get(host, host)
+        start = _delay(provider, kwargs.get("timeout"))
+        status, body, headers = self._lookup(request)
+        STATS.add(provider, time.perf_counter() - start)
+
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = body.encode("utf-8")
+        resp.headers.update(headers)
+        resp.encoding = "utf-8"
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+    def _lookup(self, request):
+        recorded = os.path.join(RECORDED_DIR, _fixture_key(request) + ".json")
+        if os.path.exists(recorded):
+            with open(recorded, encoding="utf-8") as f:
+                r = json.load(f)
+            return r["status"], r["body"], r.get("headers", {})
+
+        parts = urlsplit(request.url)
+        symbol = _symbol_of(request.url)
+        if parts.hostname == "finnhub.io" and parts.path.endswith("/company-news"):
+            return 200, _template("finnhub_company_news.json", symbol), {"Content-Type": "application/json"}
+        if parts.hostname == "finnhub.io" and parts.path.endswith("/news"):
+            return 200, _template("finnhub_general_news.json", None), {"Content-Type": "application/json"}
+        if parts.hostname == "api.stocktwits.com":
+            return 200, _template("stocktwits_stream.json", symbol), {"Content-Type": "application/json"}
+        if parts.hostname == "finance.yahoo.com":
+            name = "yahoo_most_active.html" if "most-active" in parts.path else "yahoo_home.html"
+            with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+                return 200, f.read(), {"Content-Type": "text/html"}
+        return 404, "", {}
+
+    def close(self):
+        pass
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Passes requests through to the network and saves each response as a fixture."""
+
+    def send(self, request, **kwargs):
+        resp = super().send(request, **kwargs)
+        os.makedirs(RECORDED_DIR, exist_ok=True)
+        path = os.path.join(RECORDED_DIR, _fixture_key(request) + ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "status": resp.status_code,
+                "headers": {k: v for k, v in resp.headers.items() if k.lower() in ("content-type", "etag", "last-modified")},
+                "body": resp.text,
+            }, f)
+        return resp
+
+# ---------- yfinance ----------
+
+def _closes(symbol, index):
+    rng = random.Random(symbol)
+    start = rng.uniform(10, 500)
+    steps = np.array([rng.gauss(0, 0.02) for _ in range(len(index))])
+    return start * np.exp(np.cumsum(steps))
+
+def fake_download(symbols, period=None, start=None, **kwargs):
+    t = _delay("yfinance", kwargs.get("timeout"))
+    symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+    end = pd.Timestamp.today().normalize()
+    index = pd.bdate_range(end=end, periods=22 if period == "1mo" else 300)
+    if start is not None:
+        index = index[index >= pd.Timestamp(start)]
+    data = {}
+    for s in symbols:
+        c = _closes(s, pd.bdate_range(end=end, periods=300))[-len(index):]
+        for field, mult in (("Close", 1.0), ("High", 1.01), ("Low", 0.99), ("Open", 1.0)):
+            data[(field, s)] = c * mult
+        data[("Volume", s)] = np.full(len(index), 1e6)
+    frame = pd.DataFrame(data, index=index)
+    frame.columns = pd.MultiIndex.from_tuples(frame.columns, names=["Price", "Ticker"])
+    STATS.add("yfinance", time.perf_counter() - t)
+    return frame
+
+
+class FakeTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        t = _delay("yfinance_info")
+        STATS.add("yfinance_info", time.perf_counter() - t)
+        return {
+            "shortName": f"{self.symbol.title()} Inc.",
+            "longBusinessSummary": f"{self.symbol} designs, manufactures and sells products worldwide.",
+        }
+
+    def history(self, period="1mo"):
+        return fake_download([self.symbol], period=period).xs(self.symbol, axis=1, level=1)
+
+# ---------- OpenAI ----------
+
+def fake_completion(model=None, messages=None, max_tokens=300, stream=False, **kwargs):
+    prompt = messages[-1]["content"]
+    symbols = re.findall(r"\(([A-Z.\-]{1,10})\): Price", prompt)
+    if "'### SYMBOL'" in prompt:
+        text = "\n".join(f"### {s}\n{s} looks range-bound; watch volume and the news flow." for s in symbols)
+    else:
+        text = " ".join(f"{s}: momentum and sentiment are mixed; news flow is the swing factor." for s in symbols)
+        text += " Macro: yields and the Fed dominate."
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = min(max_tokens, len(text) // 4)
+    usage = SimpleNamespace(
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+    latency = _profile.get("openai", 0)
+    t = time.perf_counter()
+
+    if not stream:
+        if latency:
+            time.sleep(latency)
+        STATS.add("openai", time.perf_counter() - t)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=usage
+        )
+
+    def chunks():
+        words = text.split(" ")
+        for i, w in enumerate(words):
+            if latency:
+                time.sleep(latency / len(words))
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=w + (" " if i < len(words) - 1 else "")))],
+                usage=None,
+            )
+        STATS.add("openai", time.perf_counter() - t)
+        yield SimpleNamespace(choices=[], usage=usage)
+    return chunks()
+
+# ---------- Telegram ----------
+
+class FakeMessage:
+    _ids = 0
+
+    def __init__(self, text="", chat=None):
+        FakeMessage._ids += 1
+        self.message_id = FakeMessage._ids
+        self.text = text
+        self.chat = chat
+        self.sent = []  # replies and edits, as (kind, text, perf_counter)
+
+    async def reply_text(self, text, **kwargs):
+        import asyncio
+        t = time.perf_counter()
+        if _profile.get("telegram"):
+            await asyncio.sleep(_profile["telegram"])
+        STATS.add("telegram", time.perf_counter() - t)
+        reply = FakeMessage(text, self.chat)
+        reply.sent = self.sent
+        self.sent.append(("send", text, time.perf_counter()))
+        return reply
+
+    async def edit_text(self, text, **kwargs):
+        import asyncio
+        t = time.perf_counter()
+        if _profile.get("telegram"):
+            await asyncio.sleep(_profile["telegram"])
+        STATS.add("telegram", time.perf_counter() - t)
+        self.text = text
+        self.sent.append(("edit", text, time.perf_counter()))
+        return self
+
+def fake_update(text, chat_id=1):
+    chat = SimpleNamespace(id=chat_id, type="private")
+    return SimpleNamespace(
+        message=FakeMessage(text, chat), effective_chat=chat,
+        effective_user=SimpleNamespace(id=chat_id), update_id=FakeMessage._ids,
+    )
+
+def fake_context(bot_data=None):
+    return SimpleNamespace(bot_data=bot_data if bot_data is not None else {}, chat_data={}, user_data={})
+
+# ---------- Installation ----------
+
+def install(record=False):
+    """Patches the bot's upstreams. With record=True, HTTP goes to the network and is saved."""
+    import api.finnhub
+    import api.yfinance
+    import summarizer
+    from utils.http_client import get_session
+
+    session = get_session()
+    adapter = RecordingAdapter() if record else ReplayAdapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    api.finnhub.set_api_key(os.environ.get("FINNHUB_API_KEY") if record else "replay")
+
+    if not record:
+        api.yfinance.yf.download = fake_download
+        api.yfinance.yf.Ticker = FakeTicker
+    summarizer.openai.chat.completions.create = fake_completion
+
+def reset_caches():
+    """Forget everything cached so the next run starts cold."""
+    import api.finnhub
+    import api.stocktwits
+    import api.yahoo
+    import summarizer
+    import utils.circuit
+    from utils.cache import get_cache
+
+    get_cache().clear()
+    api.stocktwits._tracker.clear()
+    api.finnhub._news.clear()
+    with utils.circuit._breakers_lock:
+        utils.circuit._breakers.clear()
+    with api.yahoo._validators_lock:
+        api.yahoo._validators.clear()
+    with summarizer._llm_flight._lock:
+        summarizer._llm_flight._results.clear()
@@ -0,0 +1,157 @@
+"""
+Headless batch mode: runs the same pipeline the bot uses for a list of
+tickers, without Telegram, and streams one row per ticker as it finishes.
+
+    python cli.py AAPL MSFT NVDA                       # JSON Lines on stdout
+    python cli.py -f tickers.txt --format csv -o out.csv --workers 16
+    python cli.py -f - --no-llm --metrics < tickers.txt
+    python cli.py -f sp500.txt --top 10                # rank on price, analyze the top 10
+
+Prices are fetched in grouped downloads of --price-batch symbols; news,
+sentiment, profile and (unless --no-llm) the LLM analysis then run for up to
+--workers tickers at a time, each under its own --deadline. `summary` is the
+company description; the LLM's text goes in `analysis`.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import load_config, COMMAND_DEADLINE_SECONDS, TOKEN_FLUSH_SECONDS
+from api.finnhub import set_api_key
+from pipeline import enrich_packages, get_price_packages, rank_packages
+from summarizer import summarize_stocks
+from utils.deadline import deadline
+from utils.metrics import METRICS, trace
+from utils.tickers import clean_tickers
+from utils.token_persistence import get_ledger
+
+CSV_FIELDS = (
+    "symbol", "shortName", "price", "pct_1d", "pct_5d", "pct_1m", "pct_3m", "pct_ytd",
+    "mentions", "bull", "bear", "news", "missing", "summary", "analysis", "error", "seconds",
+)
+
+
+def read_tickers(symbols, path=None):
+    """Tickers from the arguments plus `path` ('-' for stdin): whitespace/comma separated, '#' starts a comment."""
+    words = list(symbols)
+    if path:
+        with (contextlib.nullcontext(sys.stdin) if path == "-" else open(path, encoding="utf-8")) as f:
+            for line in f:
+                words += line.split("#", 1)[0].replace(",", " ").split()
+    return list(dict.fromkeys(clean_tickers([w.upper() for w in words], strict=False)))
+
+def analyze(pkg, llm, seconds):
+    """Enriches one priced package (and adds its LLM analysis) under a per-ticker deadline."""
+    start = time.perf_counter()
+    with trace("batch", symbol=pkg["symbol"]), deadline(seconds):
+        try:
+            enrich_packages([pkg])
+            if llm:
+                pkg["analysis"] = summarize_stocks([pkg], f"Analysis for {pkg['symbol']}", mode="ticker")
+        except Exception as e:
+            pkg["error"] = str(e)
+    pkg["seconds"] = round(time.perf_counter() - start, 3)
+    return pkg
+
+def price_batch_or_errors(symbols):
+    try:
+        return get_price_packages(symbols)
+    except Exception as e:
+        return [{"symbol": s, "price": "N/A", "error": f"price download failed: {e}"} for s in symbols]
+
+def csv_row(pkg):
+    crowd = pkg.get("crowd") or {}
+    row = {k: pkg.get(k) for k in CSV_FIELDS}
+    row.update(
+        mentions=crowd.get("mentions"), bull=crowd.get("bull"), bear=crowd.get("bear"),
+        news=" | ".join(pkg.get("news") or []), missing=";".join(pkg.get("missing") or []),
+    )
+    return row
+
+def run(tickers, out, fmt="jsonl", workers=8, llm=True, top=None, price_batch=100, seconds=COMMAND_DEADLINE_SECONDS):
+    """Writes one row per ticker to `out` as each finishes (not in input order). Returns the rows' count."""
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+    done = queue.Queue()
+    batches = [tickers[i: i + price_batch] for i in range(0, len(tickers), price_batch)]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as pool:
+        def submit(pkgs):
+            for p in pkgs:
+                if "error" in p:
+                    failed = Future()
+                    failed.set_result(p)
+                    done.put(failed)
+                else:
+                    pool.submit(analyze, p, llm, seconds).add_done_callback(done.put)
+
+        if top:
+            # Ranking needs every price first; only the survivors are enriched
+            priced = [p for b in batches for p in price_batch_or_errors(b)]
+            survivors = rank_packages([p for p in priced if "error" not in p], top)
+            submit(survivors)
+            total = len(survivors)
+        else:
+            # Later price batches download while the first tickers are enriched
+            threading.Thread(target=lambda: [submit(price_batch_or_errors(b)) for b in batches], daemon=True).start()
+            total = len(tickers)
+
+        for _ in range(total):
+            pkg = done.get().result()
+            if writer is not None:
+                writer.writerow(csv_row(pkg))
+            else:
+                out.write(json.dumps(pkg, default=str) + "\n")
+            out.flush()
+    return total
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the stock pipeline for many tickers without Telegram.")
+    ap.add_argument("tickers", nargs="*", help="ticker symbols")
+    ap.add_argument("-f", "--file", help="file with tickers ('-' for stdin)")
+    ap.add_argument("-o", "--output", help="output file (default: stdout)")
+    ap.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    ap.add_argument("--workers", type=int, default=8, help="tickers analyzed at once (default 8)")
+    ap.add_argument("--no-llm", action="store_true", help="skip the LLM analysis")
+    ap.add_argument("--top", type=int, help="rank all tickers on price data and only analyze the best N")
+    ap.add_argument("--price-batch", type=int, default=100, help="symbols per grouped price download")
+    ap.add_argument("--deadline", type=float, default=COMMAND_DEADLINE_SECONDS,
+                    help="seconds per ticker for provider calls (0: none)")
+    ap.add_argument("--metrics", action="store_true", help="print the metrics registry to stderr at the end")
+    args = ap.parse_args(argv)
+
+    tickers = read_tickers(args.tickers, args.file)
+    if not tickers:
+        ap.error("no valid tickers given")
+
+    config = load_config()
+    set_api_key(config["FINNHUB_API_KEY"])
+    if not args.no_llm:
+        get_ledger().start(interval=TOKEN_FLUSH_SECONDS)
+
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        # The pipeline's own log lines must not end up in the rows
+        with contextlib.redirect_stdout(sys.stderr):
+            count = run(
+                tickers, out, fmt=args.format, workers=args.workers, llm=not args.no_llm,
+                top=args.top, price_batch=max(1, args.price_batch), seconds=args.deadline,
+            )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"{count} tickers in {elapsed:.1f}s ({count / elapsed:.1f}/s)", file=sys.stderr)
+    if args.metrics:
+        print(METRICS.render(), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -17,4 +17,166 @@ def load_config():
         "REDDIT_USER_AGENT": os.getenv("REDDIT_USER_AGENT"),
     }
 
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+# Max in-flight calls per data provider when fanning out over many tickers
+PROVIDER_CONCURRENCY = {
+    "yfinance": _env_int("YFINANCE_CONCURRENCY", 4),
+    "finnhub": _env_int("FINNHUB_CONCURRENCY", 4),
+    "stocktwits": _env_int("STOCKTWITS_CONCURRENCY", 3),
+    "yahoo": _env_int("YAHOO_CONCURRENCY", 2),
+    "openai": _env_int("OPENAI_CONCURRENCY", 3),
+}
+DEFAULT_PROVIDER_CONCURRENCY = _env_int("DEFAULT_PROVIDER_CONCURRENCY", 2)
+
+# SUMMARY ranking: scorer name from utils/ranking.py and how many tickers survive
+SUMMARY_RANKER = os.getenv("SUMMARY_RANKER", "abs_move")
+SUMMARY_TOP_N = _env_int("SUMMARY_TOP_N", 5)
+TRENDING_TOP_N = _env_int("TRENDING_TOP_N", 10)
+
+# Background SUMMARY snapshot: refresh interval (0 disables), how long the
+# fetched data and the generated summary may be reused, in seconds
+SNAPSHOT_REFRESH_SECONDS = _env_int("SNAPSHOT_REFRESH_SECONDS", 300)
+SNAPSHOT_MAX_AGE = _env_int("SNAPSHOT_MAX_AGE", 600)
+SUMMARY_MAX_AGE = _env_int("SUMMARY_MAX_AGE", 300)
+
+# Stream LLM replies into Telegram by editing a placeholder message, at most
+# one edit per STREAM_EDIT_INTERVAL seconds
+STREAM_REPLIES = _env_int("STREAM_REPLIES", 1)
+STREAM_EDIT_INTERVAL = _env_float("STREAM_EDIT_INTERVAL", 1.5)
+
+# Identical LLM prompts within this many seconds reuse the earlier summary
+LLM_CACHE_SECONDS = _env_int("LLM_CACHE_SECONDS", 120)
+LLM_CACHE_MAX_ENTRIES = _env_int("LLM_CACHE_MAX_ENTRIES", 64)
+
+# How often the in-memory token ledger is written back to token_data.json
+TOKEN_FLUSH_SECONDS = _env_int("TOKEN_FLUSH_SECONDS", 30)
+
+# Prompts larger than this (in tokens) get headlines shortened/dropped until they fit
+PROMPT_TARGET_TOKENS = {
+    "summary": _env_int("PROMPT_TARGET_SUMMARY", 1200),
+    "ticker": _env_int("PROMPT_TARGET_TICKER", 600),
+    "multi": _env_int("PROMPT_TARGET_MULTI", 1500),
+}
+
+# Multi-ticker messages: tickers per completion and token allowance per ticker
+MULTI_TICKER_BATCH = max(1, _env_int("MULTI_TICKER_BATCH", 4))
+MULTI_TICKER_TOKENS = _env_int("MULTI_TICKER_TOKENS", 220)
+
+# Shared HTTP client: default timeout, keep-alive pool size, 429 retries and
+# per-host rate limits as (requests, per seconds)
+HTTP_TIMEOUT = _env_int("HTTP_TIMEOUT", 12)
+HTTP_POOL_SIZE = _env_int("HTTP_POOL_SIZE", 10)
+HTTP_MAX_RETRIES = _env_int("HTTP_MAX_RETRIES", 2)
+RATE_LIMITS = {
+    "finnhub.io": (_env_int("FINNHUB_RATE_PER_MIN", 60), 60),
+    "api.stocktwits.com": (_env_int("STOCKTWITS_RATE_PER_HOUR", 200), 3600),
+}
+
+# Provider response cache: TTL in seconds per source, LRU bound, optional disk tier
+CACHE_TTLS = {
+    "profile": _env_int("CACHE_TTL_PROFILE", 24 * 3600),
+    "company_news": _env_int("CACHE_TTL_NEWS", 300),
+    "global_news": _env_int("CACHE_TTL_NEWS", 300),
+    "sentiment": _env_int("CACHE_TTL_SENTIMENT", 120),
+    "quote": _env_int("CACHE_TTL_QUOTE", 30),
+    "trending": _env_int("CACHE_TTL_TRENDING", 120),
+}
+CACHE_MAX_ENTRIES = _env_int("CACHE_MAX_ENTRIES", 512)
+# Set CACHE_DB_PATH to an empty string to keep the cache in memory only
+CACHE_DB_PATH = os.path.expanduser(
+    os.getenv("CACHE_DB_PATH", "~/investment_news_bot/cache.sqlite3")
+)
+# Only entries living at least CACHE_DISK_MIN_TTL seconds are worth keeping
+# across a restart; disk writes are batched every CACHE_FLUSH_SECONDS
+CACHE_DISK_MIN_TTL = _env_int("CACHE_DISK_MIN_TTL", 300)
+CACHE_FLUSH_SECONDS = _env_int("CACHE_FLUSH_SECONDS", 5)
+
+# Finnhub headlines are ingested incrementally into a bounded in-memory store
+# (refreshed after CACHE_TTL_NEWS); a headline within NEWS_SIMHASH_DISTANCE bits
+# of a stored one is the same story unless the words that differ change its meaning
+# ("raises" vs "cuts" guidance are kept apart however close their hashes are)
+NEWS_MAX_PER_FEED = _env_int("NEWS_MAX_PER_FEED", 40)
+NEWS_MAX_FEEDS = _env_int("NEWS_MAX_FEEDS", 500)
+NEWS_SIMHASH_DISTANCE = _env_int("NEWS_SIMHASH_DISTANCE", 14)
+
+# StockTwits sentiment is tracked incrementally per symbol in rolling 1h/24h/7d
+# windows, refreshed at most every SENTIMENT_REFRESH_SECONDS and saved to
+# SENTIMENT_STORE_PATH (empty string: memory only); the SENTIMENT_MAX_SYMBOLS
+# most recently asked for are kept
+SENTIMENT_REFRESH_SECONDS = _env_int("SENTIMENT_REFRESH_SECONDS", CACHE_TTLS["sentiment"])
+SENTIMENT_MAX_SYMBOLS = _env_int("SENTIMENT_MAX_SYMBOLS", 500)
+SENTIMENT_STORE_PATH = os.path.expanduser(
+    os.getenv("SENTIMENT_STORE_PATH", "~/investment_news_bot/sentiment.json")
+)
+STOCKTWITS_MAX_PAGES = _env_int("STOCKTWITS_MAX_PAGES", 3)
+
+# Watchlists and price alerts: all rules are checked every ALERT_POLL_SECONDS
+# (0 disables the job) with one batched quote request; WATCH alerts on daily
+# moves of WATCH_MOVE_PERCENT
+ALERTS_PATH = os.path.expanduser(os.getenv("ALERTS_PATH", "~/investment_news_bot/alerts.json"))
+ALERT_POLL_SECONDS = _env_int("ALERT_POLL_SECONDS", 300)
+WATCH_MOVE_PERCENT = _env_float("WATCH_MOVE_PERCENT", 5.0)
+MAX_ALERTS_PER_CHAT = _env_int("MAX_ALERTS_PER_CHAT", 50)
+
+# Market digest for subscribed chats, sent on weekdays at each of DIGEST_TIMES
+# (HH:MM in DIGEST_TIMEZONE; empty disables it)
+DIGEST_PATH = os.path.expanduser(os.getenv("DIGEST_PATH", "~/investment_news_bot/digest.json"))
+DIGEST_TIMES = [t.strip() for t in os.getenv("DIGEST_TIMES", "08:30,16:15").split(",") if t.strip()]
+DIGEST_TIMEZONE = os.getenv("DIGEST_TIMEZONE", "America/New_York")
+
+# Messages the bot sends on its own (digests, alerts) are queued to stay within
+# Telegram's limits: OUTBOX_RATE per second overall, one per
+# OUTBOX_CHAT_INTERVAL seconds per chat (OUTBOX_GROUP_INTERVAL in groups)
+OUTBOX_RATE = _env_int("OUTBOX_RATE", 30)
+OUTBOX_CHAT_INTERVAL = _env_float("OUTBOX_CHAT_INTERVAL", 1.0)
+OUTBOX_GROUP_INTERVAL = _env_float("OUTBOX_GROUP_INTERVAL", 3.0)
+
+# Each user command gets COMMAND_DEADLINE_SECONDS for its provider calls; data
+# still missing by then is left out and flagged in the prompt. A provider
+# failing BREAKER_FAILURES times in a row is skipped for BREAKER_RESET_SECONDS
+COMMAND_DEADLINE_SECONDS = _env_float("COMMAND_DEADLINE_SECONDS", 20)
+BREAKER_FAILURES = _env_int("BREAKER_FAILURES", 5)
+BREAKER_RESET_SECONDS = _env_int("BREAKER_RESET_SECONDS", 30)
+
+# Messages from different chats are handled concurrently (CHAT_CONCURRENCY at a
+# time), each chat's in order; at most MAX_QUEUED_MESSAGES wait before new ones
+# are turned away
+CHAT_CONCURRENCY = _env_int("CHAT_CONCURRENCY", 4)
+MAX_QUEUED_MESSAGES = _env_int("MAX_QUEUED_MESSAGES", 20)
+
+# Local daily price history (SQLite); empty string disables it. Bars older than
+# PRICE_HISTORY_DAYS are pruned, which keeps it a few MB for a few hundred symbols
+PRICE_STORE_PATH = os.path.expanduser(
+    os.getenv("PRICE_STORE_PATH", "~/investment_news_bot/prices.sqlite3")
+)
+PRICE_HISTORY_DAYS = _env_int("PRICE_HISTORY_DAYS", 400)
+
+# Heavy dependencies (pandas/numpy/yfinance, openai, bs4) are imported on first
+# use so polling starts sooner; LAZY_IMPORTS=0 restores eager imports. With
+# WARM_UP on, they are loaded in the background WARM_UP_DELAY seconds after the
+# bot is online
+LAZY_IMPORTS = _env_int("LAZY_IMPORTS", 1)
+WARM_UP = _env_int("WARM_UP", 1)
+WARM_UP_DELAY = _env_float("WARM_UP_DELAY", 2)
+
+# Prometheus text metrics served from the bot process; METRICS_PORT=0 disables it.
+# Per-request traces are kept in memory for /traces, and printed as JSON lines
+# when TRACE_LOG is set or a request takes longer than TRACE_SLOW_SECONDS
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = _env_int("METRICS_PORT", 9108)
+TRACE_LOG = _env_int("TRACE_LOG", 0)
+TRACE_SLOW_SECONDS = _env_float("TRACE_SLOW_SECONDS", 15)
+TRACE_KEEP = _env_int("TRACE_KEEP", 50)
+
 startup_warnings = []
\ No newline at end of file
@@ -0,0 +1,102 @@
+import threading
+from pipeline import build_summary_packages, get_summary_candidates
+from summarizer import summarize_stocks
+from utils.jsonfile import read_json, write_json_atomic
+
+SUMMARY_TITLE = "Overall Market Summary"
+
+HELP = (
+    "Market digest:\n"
+    "SUBSCRIBE – get the scheduled market digest\n"
+    "UNSUBSCRIBE – stop it"
+)
+
+
+class Digest:
+    """
+    Chats subscribed to the scheduled market digest. The digest is composed
+    once per run and the same text is sent to every subscriber. The chat set
+    up as TELEGRAM_CHAT_ID is subscribed until it unsubscribes.
+    """
+
+    def __init__(self, path=None, default_chat=None, snapshot=None, trending_n=10, top_n=5):
+        self.path = path
+        self.snapshot = snapshot
+        self.trending_n = trending_n
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        data = read_json(path) if path else {}
+        if "chats" in data:
+            self._chats = set(data["chats"])
+        else:
+            self._chats = {int(default_chat)} if str(default_chat or "").lstrip("-").isdigit() else set()
+
+    # ---------- Subscribers ----------
+    def subscribe(self, chat_id):
+        with self._lock:
+            if chat_id in self._chats:
+                return False
+            self._chats.add(chat_id)
+        self.save()
+        return True
+
+    def unsubscribe(self, chat_id):
+        with self._lock:
+            if chat_id not in self._chats:
+                return False
+            self._chats.discard(chat_id)
+        self.save()
+        return True
+
+    def chats(self):
+        with self._lock:
+            return sorted(self._chats)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"chats": sorted(self._chats)}
+        try:
+            write_json_atomic(self.path, data)
+        except Exception as e:
+            print("Saving digest subscribers failed:", e)
+
+    # ---------- Digest ----------
+    def compose(self, title, context=None):
+        """
+        The digest text, or None if there is nothing to send. Uses the SUMMARY
+        snapshot when it is fresh (and feeds the result back to it), so a
+        digest right after a SUMMARY costs no extra LLM call.
+        """
+        ready = self.snapshot.packages() if self.snapshot is not None else None
+        if ready:
+            generation, top, global_news = ready
+            summary = self.snapshot.summary()
+        else:
+            generation, global_news, summary = None, None, None
+            top = build_summary_packages(get_summary_candidates(self.trending_n), self.top_n)
+        if summary is None:
+            if not top:
+                return None
+            summary = summarize_stocks(top, SUMMARY_TITLE, mode="summary", context=context, global_news=global_news)
+            if summary.startswith("AI summary failed"):
+                print("Digest skipped:", summary)
+                return None
+            if generation is not None:
+                self.snapshot.store_summary(generation, summary)
+        return f"{title}\n\n{summary}"
+
+    # ---------- Commands ----------
+    def handle(self, text, chat_id):
+        """Replies to SUBSCRIBE / UNSUBSCRIBE, or returns None if `text` is neither."""
+        words = text.upper().split()
+        if words == ["SUBSCRIBE"]:
+            if self.subscribe(chat_id):
+                return "📰 Subscribed: you'll get the market digest on trading days."
+            return "You're already subscribed.\n\n" + HELP
+        if words == ["UNSUBSCRIBE"]:
+            if self.unsubscribe(chat_id):
+                return "Unsubscribed from the market digest."
+            return "You're not subscribed.\n\n" + HELP
+        return None
@@ -1,34 +1,115 @@
-from config import load_config, startup_warnings
+from config import (
+    load_config, startup_warnings, SUMMARY_TOP_N, TRENDING_TOP_N,
+    SNAPSHOT_REFRESH_SECONDS, SNAPSHOT_MAX_AGE, SUMMARY_MAX_AGE, TOKEN_FLUSH_SECONDS,
+    METRICS_HOST, METRICS_PORT, WARM_UP, ALERTS_PATH, WATCH_MOVE_PERCENT, MAX_ALERTS_PER_CHAT,
+    DIGEST_PATH, PROMPT_TARGET_TOKENS
+)
 from api.yahoo import get_top_volume_tickers, get_most_mentioned_tickers
-from api.finnhub import set_api_key, get_company_news, get_global_news
-from api.stocktwits import get_crowd_sentiment
-from api.yfinance import get_stock_data_yf
-from utils.tickers import clean_tickers
-from summarizer import summarize_stocks
+from api.finnhub import set_api_key
+from api.yfinance import get_store
+from utils.tickers import clean_tickers, get_universe
+from pipeline import get_stock_package, get_stock_packages, build_summary_packages
+from market_snapshot import MarketSnapshot
+from alerts import AlertBook
+from digest import Digest
+from summarizer import summarize_stocks, summarize_tickers, warm_up_client
 from telegram_handler import start_bot
-from utils.token_persistence import load_token_data
+from utils.token_persistence import get_ledger
+from utils.budget import mode_tokens_used
+from utils.cache import cache_stats, get_cache
+from utils.circuit import breaker_states
+from utils.prompt import count_tokens, savings_totals
+from utils.metrics import METRICS, serve_metrics, trace
+from utils.lazy import preload
 
+HEAVY_MODULES = ["numpy", "pandas", "yfinance", "openai", "bs4", "lxml"]
 
-def get_stock_package(symbol):
-    d = get_stock_data_yf(symbol)
-    d["news"] = get_company_news(symbol)
-    d["crowd"] = get_crowd_sentiment(symbol)
-    return d
+
+def ledger_gauges(ledger):
+    return lambda: [
+        ("investo_tokens_used", {}, ledger.tokens_used),
+        ("investo_token_budget", {}, ledger.primary_budget),
+        ("investo_tokens_saved", {}, ledger.tokens_saved),
+    ] + [("investo_tokens_used_by_mode", {"mode": mode}, mode_tokens_used(ledger, mode)) for mode in PROMPT_TARGET_TOKENS]
+
+def cache_gauges():
+    return [
+        (f"investo_cache_{stat}", {"source": source}, value)
+        for source, counts in cache_stats().items() for stat, value in counts.items()
+    ]
+
+def prompt_gauges():
+    # Prompt tokens saved per compaction step since startup
+    return [("investo_prompt_tokens_saved", {"step": step}, saved) for step, saved in savings_totals().items()]
+
+def breaker_gauges():
+    # 1 for the state each provider's circuit is in
+    return [
+        ("investo_circuit_state", {"provider": name, "state": state}, 1)
+        for name, state in breaker_states().items()
+    ]
+
+
+def warm_up():
+    with trace("warm_up"):
+        preload(HEAVY_MODULES)
+        get_store()
+        get_cache()
+        get_universe()
+        count_tokens("")  # loads the tokenizer's encoding
+        try:
+            warm_up_client()
+        except Exception as e:
+            print("OpenAI client warm-up failed:", e)
+    print("Warm-up done")
 
 def main():
     config = load_config()
     set_api_key(config['FINNHUB_API_KEY'])
 
-    # Load tokens and budget from file
-    tokens_used, primary_budget = load_token_data()
+    # Load tokens and budget from file; the ledger writes changes back in the background
+    ledger = get_ledger()
+    ledger.start(interval=TOKEN_FLUSH_SECONDS)
+
+    METRICS.add_collector(ledger_gauges(ledger))
+    METRICS.add_collector(cache_gauges)
+    METRICS.add_collector(breaker_gauges)
+    METRICS.add_collector(prompt_gauges)
+    if METRICS_PORT:
+        serve_metrics(METRICS_HOST, METRICS_PORT)
+
+    # Kept warm by a scheduled job so SUMMARY only needs the final LLM call
+    snapshot = None
+    if SNAPSHOT_REFRESH_SECONDS > 0:
+        snapshot = MarketSnapshot(
+            trending_n=TRENDING_TOP_N, top_n=SUMMARY_TOP_N,
+            max_age=SNAPSHOT_MAX_AGE, summary_max_age=SUMMARY_MAX_AGE
+        )
+
+    # Per-chat watchlists and alert rules, checked by a scheduled job
+    alerts = AlertBook(ALERTS_PATH, default_move=WATCH_MOVE_PERCENT, max_rules_per_chat=MAX_ALERTS_PER_CHAT)
+
+    # Subscribers of the scheduled market digest; TELEGRAM_CHAT_ID is the first one
+    digest = Digest(
+        DIGEST_PATH, default_chat=config["TELEGRAM_CHAT_ID"], snapshot=snapshot,
+        trending_n=TRENDING_TOP_N, top_n=SUMMARY_TOP_N
+    )
 
     start_bot(
         config, startup_warnings, get_stock_package,
         get_top_volume_tickers, get_most_mentioned_tickers,
         clean_tickers, summarize_stocks,
-        tokens_used=tokens_used,
-        primary_budget=primary_budget
+        tokens_used=ledger.tokens_used,
+        primary_budget=ledger.primary_budget,
+        tokens_saved=ledger.tokens_saved,
+        get_stock_packages=get_stock_packages,
+        build_summary_packages=build_summary_packages,
+        snapshot=snapshot,
+        summarize_tickers=summarize_tickers,
+        warm_up=warm_up if WARM_UP else None,
+        alerts=alerts,
+        digest=digest
     )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
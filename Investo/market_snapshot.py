@@ -0,0 +1,85 @@
+import threading
+import time
+from api.finnhub import get_global_news
+from pipeline import get_summary_candidates, get_price_packages, enrich_packages, rank_packages
+
+PRICE_FIELDS = ("price", "pct_1d", "pct_5d", "pct_1m")
+
+
+class MarketSnapshot:
+    """
+    Ready-made inputs for the market SUMMARY, kept warm by a scheduled job.
+    Refreshes are incremental: prices are re-screened every time (the quote
+    cache keeps that cheap), but news/crowd/profile are only refetched for
+    tickers that newly made the top N or whose enrichment went stale.
+    """
+
+    def __init__(self, trending_n=10, top_n=5, max_age=600, summary_max_age=300):
+        self.trending_n = trending_n
+        self.top_n = top_n
+        self.max_age = max_age
+        self.summary_max_age = summary_max_age
+        self._lock = threading.Lock()
+        self._enriched = {}  # symbol -> (fetched_at, package)
+        self._top = []
+        self._global_news = []
+        self._updated_at = 0.0
+        self._generation = 0
+        self._summary = None  # (generation, created_at, text)
+
+    def refresh(self):
+        candidates = get_summary_candidates(self.trending_n)
+        if not candidates:
+            return False
+        survivors = rank_packages(get_price_packages(candidates), self.top_n)
+
+        now = time.time()
+        with self._lock:
+            enriched = dict(self._enriched)
+        top, stale = [], []
+        for p in survivors:
+            prev = enriched.get(p["symbol"])
+            if prev and now - prev[0] < self.max_age:
+                pkg = dict(prev[1])
+                pkg.update({k: p[k] for k in PRICE_FIELDS})
+            else:
+                pkg = p
+                stale.append(p)
+            top.append(pkg)
+        enrich_packages(stale)
+        global_news = get_global_news()
+
+        with self._lock:
+            for p in stale:
+                # Partial packages are enriched again on the next refresh
+                if not p.get("missing"):
+                    self._enriched[p["symbol"]] = (now, p)
+            for s, (fetched_at, _) in list(self._enriched.items()):
+                if now - fetched_at >= self.max_age:
+                    del self._enriched[s]
+            self._top = top
+            self._global_news = global_news
+            self._updated_at = now
+            self._generation += 1
+        return True
+
+    def packages(self):
+        """Returns (generation, top packages, global news), or None if the snapshot is stale."""
+        with self._lock:
+            if not self._top or time.time() - self._updated_at >= self.max_age:
+                return None
+            return self._generation, [dict(p) for p in self._top], list(self._global_news)
+
+    def summary(self):
+        with self._lock:
+            if not self._summary:
+                return None
+            generation, created_at, text = self._summary
+            if generation != self._generation or time.time() - created_at >= self.summary_max_age:
+                return None
+            return text
+
+    def store_summary(self, generation, text):
+        with self._lock:
+            if generation == self._generation:
+                self._summary = (generation, time.time(), text)
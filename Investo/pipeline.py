@@ -0,0 +1,68 @@
+from api.finnhub import get_company_news
+from api.stocktwits import EMPTY, get_crowd_sentiment
+from api.yahoo import get_top_volume_tickers, get_most_mentioned_tickers
+from api.yfinance import get_stock_data_batch, get_stock_info_yf
+from config import SUMMARY_RANKER
+from utils.deadline import remaining
+from utils.fanout import fan_out, fan_out_settled
+from utils.metrics import timed
+from utils.ranking import get_scorer, top_k
+from utils.tickers import clean_tickers
+
+
+@timed("pipeline.get_stock_package")
+def get_stock_package(symbol):
+    return get_stock_packages([symbol])[0]
+
+@timed("pipeline.get_stock_packages")
+def get_stock_packages(symbols):
+    return enrich_packages(get_price_packages(symbols))
+
+def get_summary_candidates(count=10):
+    volume, mentions = fan_out([
+        ("yahoo", get_top_volume_tickers, (count,)),
+        ("yahoo", get_most_mentioned_tickers, (count,)),
+    ])
+    # Most-active rows are real listings even when outside the bundled universe
+    return list(dict.fromkeys(clean_tickers(volume, strict=False) + clean_tickers(mentions)))
+
+def get_price_packages(symbols):
+    # One grouped history download covers every symbol
+    return fan_out([("yfinance", get_stock_data_batch, (symbols,))])[0]
+
+def get_crowd_sentiments(symbols):
+    # None for symbols whose sentiment could not be fetched
+    results = fan_out_settled([("stocktwits", get_crowd_sentiment, (s,)) for s in symbols], remaining())
+    return [value if ok else None for ok, value in results]
+
+def enrich_packages(pkgs):
+    # Every enrichment call for every ticker is in flight at once (within the
+    # per-provider caps); results are reassembled in the order of `pkgs`.
+    # A call that fails or outlives the request deadline leaves its part empty
+    # and named in p["missing"], so the prompt can say what is absent.
+    calls = []
+    for p in pkgs:
+        s = p["symbol"]
+        calls.append(("yfinance", get_stock_info_yf, (s,)))
+        calls.append(("finnhub", get_company_news, (s,)))
+        calls.append(("stocktwits", get_crowd_sentiment, (s,)))
+    results = fan_out_settled(calls, remaining())
+
+    for i, p in enumerate(pkgs):
+        (info_ok, info), (news_ok, news), (crowd_ok, crowd) = results[3 * i: 3 * i + 3]
+        p.update(info if info_ok else {"shortName": p["symbol"], "summary": ""})
+        p["news"] = news if news_ok else []
+        p["crowd"] = crowd if crowd_ok else dict(EMPTY)
+        parts = (("price", p.get("price") != "N/A"), ("profile", info_ok), ("news", news_ok), ("sentiment", crowd_ok))
+        p["missing"] = [name for name, ok in parts if not ok]
+    return pkgs
+
+def rank_packages(priced, top_n=5, scorer=None):
+    return top_k(priced, top_n, scorer or get_scorer(SUMMARY_RANKER))
+
+@timed("pipeline.build_summary_packages")
+def build_summary_packages(symbols, top_n=5, scorer=None):
+    # Stage one: price data only, for every candidate
+    priced = get_price_packages(symbols)
+    # Stage two: news, crowd and profile only for the survivors
+    return enrich_packages(rank_packages(priced, top_n, scorer))
@@ -1,22 +1,137 @@
-import openai
+import hashlib
+import json
+import re
 from api.finnhub import get_global_news
-from utils.token_persistence import save_token_data
+from config import (
+    LLM_CACHE_SECONDS, LLM_CACHE_MAX_ENTRIES, MULTI_TICKER_BATCH, MULTI_TICKER_TOKENS,
+    PROMPT_TARGET_TOKENS
+)
+from utils.budget import remaining_budget_percent
+from utils.fanout import fan_out
+from utils.lazy import lazy_import
+from utils.metrics import METRICS, timed
+from utils.prompt import PromptBuilder, scale_max_tokens
+from utils.singleflight import SingleFlight
+from utils.token_persistence import get_ledger
 
-def summarize_stocks(data_list, title, mode="summary", context=None):
+# The client is created by openai on first use, from OPENAI_API_KEY
+openai = lazy_import("openai")
+
+MODEL = "gpt-3.5-turbo"
+TEMPERATURE = 0.6
+
+# Identical prompts share one in-flight completion and reuse recent results
+_llm_flight = SingleFlight(ttl=LLM_CACHE_SECONDS, max_entries=LLM_CACHE_MAX_ENTRIES)
+
+def _prompt_key(prompt, max_tokens):
+    canonical = json.dumps({
+        "model": MODEL,
+        "temperature": TEMPERATURE,
+        "max_tokens": max_tokens,
+        "prompt": " ".join(prompt.split()),
+    }, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def warm_up_client():
+    # One cheap request builds the default client and opens its keep-alive connection
+    openai.models.retrieve(MODEL, timeout=10)
+
+@timed("openai.completion")
+def _complete(prompt, max_tokens):
+    resp = openai.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=TEMPERATURE,
+        max_tokens=max_tokens,
+    )
+    usage = getattr(resp, "usage", None)
+    return resp.choices[0].message.content.strip(), getattr(usage, "total_tokens", 0) or 0
+
+@timed("openai.completion")
+def _complete_stream(prompt, max_tokens, on_delta):
+    # The final chunk carries usage (and no choices) when include_usage is set
+    stream = openai.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=TEMPERATURE,
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    parts, tokens = [], 0
+    for chunk in stream:
+        if chunk.choices:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+        usage = getattr(chunk, "usage", None)
+        if usage:
+            tokens = getattr(usage, "total_tokens", 0) or 0
+    return "".join(parts).strip(), tokens
+
+PROFILE = (
+    "Investor profile: Interested in both short-term trades (days/weeks) and "
+    "long-term investments. Medium-high risk tolerance.\n\n"
+)
+
+def _remaining_percent():
+    ledger = get_ledger()
+    return remaining_budget_percent(ledger.tokens_used, ledger.primary_budget)
+
+@timed("summarizer.prompt")
+def _build_prompt(header, data_list, global_news=None, mode="summary"):
+    builder = PromptBuilder(header)
+    for d in data_list:
+        builder.add_stock(d)
+    if global_news is not None:
+        builder.set_global_news(global_news)
+    return builder.build(PROMPT_TARGET_TOKENS.get(mode))
+
+def _record_tokens(context, tokens, shared, mode=None, chat_id=None):
+    # --- Track tokens used (or saved by reuse); the ledger persists them ---
+    if not tokens:
+        return
+    ledger = get_ledger()
+    ledger.record(tokens, chat_id=chat_id, mode=mode, saved=shared)
+    METRICS.inc("investo_llm_tokens_total", tokens, mode=mode or "other", kind="saved" if shared else "used")
+    if context is not None:
+        ledger.mirror(context.bot_data)
+
+def _run_completion(prompt, max_tokens, context, on_delta=None, mode=None, chat_id=None):
+    if on_delta is None:
+        call = lambda: _complete(prompt, max_tokens)
+    else:
+        call = lambda: _complete_stream(prompt, max_tokens, on_delta)
+    (summary, tokens), shared = _llm_flight.do(_prompt_key(prompt, max_tokens), call)
+    _record_tokens(context, tokens, shared, mode=mode, chat_id=chat_id)
+    return summary
+
+@timed("summarizer.summarize_stocks")
+def summarize_stocks(
+    data_list, title, mode="summary", context=None, global_news=None, on_delta=None, chat_id=None
+):
+    """
+    Returns the summary text. With `on_delta`, the completion is streamed and
+    each text fragment is passed to it as it arrives (cached or shared results
+    are returned whole without calling it).
+    """
     if mode == "ticker":
-        max_tokens = 300
-        per_stock = "Use up to 300 tokens total for this single stock."
+        max_tokens = scale_max_tokens(300, _remaining_percent())
+        per_stock = f"Use up to {max_tokens} tokens total for this single stock."
     else:
-        max_tokens = 600
+        max_tokens = scale_max_tokens(600, _remaining_percent())
+        # The allowance is shared by every ticker plus the global wrap, so the
+        # instruction shrinks with it and the reply is not cut off mid-sentence
+        share = max_tokens // (len(data_list) + 1)
         per_stock = (
-            "For summary: analyze 5 best tickers with ~100 tokens each, "
-            "then finish with ~100 tokens global news wrap."
+            f"For summary: analyze the {len(data_list)} tickers with ~{share} tokens each, "
+            f"then finish with ~{share} tokens global news wrap ({max_tokens} tokens total)."
         )
 
-    prompt = (
+    header = (
         f"{title}\n\n"
-        "Investor profile: Interested in both short-term trades (days/weeks) and "
-        "long-term investments. Medium-high risk tolerance.\n\n"
+        + PROFILE +
         "Instructions:\n"
         "- Provide concise but informative analysis.\n"
         "- Avoid duplication.\n"
@@ -25,40 +140,74 @@ def summarize_stocks(data_list, title, mode="summary", context=None):
         "### Data:\n"
     )
 
-    for d in data_list:
-        crowd = d.get("crowd", {})
-        news = d.get("news", [])
-        prompt += (
-            f"- {d['shortName']} ({d['symbol']}): Price {d['price']}, "
-            f"1d {d['pct_1d']}%, 5d {d['pct_5d']}%, 1m {d['pct_1m']}%\n"
-            f"  Crowd sentiment: mentions={crowd.get('mentions')}, "
-            f"bull={crowd.get('bull')}, bear={crowd.get('bear')}\n"
-            f"  News: " + "; ".join(news if news else ["No major news"]) + "\n"
-        )
-
     if mode == "summary":
-        global_news = get_global_news()
-        prompt += "\n### Global Market News:\n" + "; ".join(global_news)
+        if global_news is None:
+            global_news = get_global_news()
+    else:
+        global_news = None
+    prompt = _build_prompt(header, data_list, global_news, mode)
 
     try:
-        resp = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.6,
-            max_tokens=max_tokens,
-        )
-        summary = resp.choices[0].message.content.strip()
+        return _run_completion(prompt, max_tokens, context, on_delta, mode=mode, chat_id=chat_id)
+    except Exception as e:
+        return f"AI summary failed: {e}"
 
-        # --- Track tokens used and persist ---
-        if context is not None and hasattr(resp, "usage"):
-            tokens_used = getattr(resp.usage, "total_tokens", 0)
-            context.bot_data["tokens_used"] = context.bot_data.get("tokens_used", 0) + tokens_used
-            save_token_data(
-                context.bot_data["tokens_used"],
-                context.bot_data.get("primary_budget", 1000)
-            )
+_SECTION_RE = re.compile(r"^#{2,4}\s*\$?([A-Z][A-Z.\-]{0,9})\b[^\n]*$", re.MULTILINE)
 
-        return summary
+def _split_sections(text, symbols):
+    found = {}
+    matches = list(_SECTION_RE.finditer(text))
+    for i, m in enumerate(matches):
+        sym = m.group(1)
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[m.end():end].strip()
+        if sym in symbols and body and sym not in found:
+            found[sym] = body
+    return found
 
+def _summarize_group(group, context, chat_id=None):
+    symbols = [d["symbol"] for d in group]
+    if len(group) == 1:
+        return [summarize_stocks(
+            group, f"Analysis for {symbols[0]}", mode="ticker", context=context, chat_id=chat_id
+        )]
+
+    per_ticker = scale_max_tokens(MULTI_TICKER_TOKENS, _remaining_percent())
+    header = (
+        "Per-ticker analysis\n\n"
+        + PROFILE +
+        "Instructions:\n"
+        "- Provide concise but informative analysis for EACH stock below.\n"
+        f"- Use up to ~{per_ticker} tokens per stock.\n"
+        "- Start each stock's section with a line of the form '### SYMBOL' and "
+        "write nothing outside those sections.\n\n"
+        "### Data:\n"
+    )
+    prompt = _build_prompt(header, group, mode="multi")
+
+    try:
+        text = _run_completion(
+            prompt, per_ticker * len(group) + 20, context, mode="multi", chat_id=chat_id
+        )
     except Exception as e:
-        return f"AI summary failed: {e}"
\ No newline at end of file
+        return [f"AI summary failed: {e}"] * len(group)
+
+    sections = _split_sections(text, set(symbols))
+    out = []
+    for d in group:
+        # Fall back to a single-ticker call if the model skipped a section
+        out.append(sections.get(d["symbol"]) or summarize_stocks(
+            [d], f"Analysis for {d['symbol']}", mode="ticker", context=context, chat_id=chat_id
+        ))
+    return out
+
+@timed("summarizer.summarize_tickers")
+def summarize_tickers(data_list, context=None, chat_id=None):
+    """
+    Summaries for several tickers using one completion per group of
+    MULTI_TICKER_BATCH tickers, with groups run in parallel. Returns one text
+    per input package, in order.
+    """
+    groups = [data_list[i: i + MULTI_TICKER_BATCH] for i in range(0, len(data_list), MULTI_TICKER_BATCH)]
+    results = fan_out([("openai", _summarize_group, (g, context, chat_id)) for g in groups])
+    return [text for group in results for text in group]
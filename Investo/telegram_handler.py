@@ -1,13 +1,140 @@
+import asyncio
+import contextvars
+import threading
+import time
+from datetime import time as day_time
+from zoneinfo import ZoneInfo
 from telegram import Update, Bot
+from telegram.error import BadRequest, Forbidden, RetryAfter
 from telegram.ext import Application, ContextTypes, MessageHandler, filters
-from utils.budget import is_token_budget_low
-from utils.token_persistence import load_primary_budget
+from utils.budget import chat_tokens_used, is_ledger_budget_low, remaining_budget_percent
+from utils.chat_queue import ChatQueue
+from utils.deadline import deadline
+from utils.messages import split_message
+from utils.metrics import METRICS, span, trace
+from utils.outbox import Outbox
+from utils.token_persistence import get_ledger
+from config import (
+    SUMMARY_TOP_N, TRENDING_TOP_N, SNAPSHOT_REFRESH_SECONDS, STREAM_REPLIES, STREAM_EDIT_INTERVAL,
+    WARM_UP_DELAY, CHAT_CONCURRENCY, MAX_QUEUED_MESSAGES, ALERT_POLL_SECONDS, COMMAND_DEADLINE_SECONDS,
+    DIGEST_TIMES, DIGEST_TIMEZONE, OUTBOX_RATE, OUTBOX_CHAT_INTERVAL, OUTBOX_GROUP_INTERVAL
+)
 
-async def send_budget_reminder(update, context, remaining_percent):
+STREAM_PLACEHOLDER = "⏳ Analyzing..."
+QUEUE_FULL = "🚦 Busy right now, please try again in a minute."
+
+
+class StreamingReply:
+    """
+    Shows an LLM reply while it is generated: sends a placeholder right away,
+    then edits it with the text so far at most once per `interval` seconds.
+    Text past Telegram's 4096-character limit rolls over into new messages.
+    `on_delta` may be called from any thread; everything else runs on the loop.
+    """
+
+    def __init__(self, message, loop, interval=STREAM_EDIT_INTERVAL):
+        self.message = message
+        self.loop = loop
+        self.interval = interval
+        self.text = ""
+        self._done = asyncio.Event()
+        self._sent = []  # [(telegram message, text shown)]
+
+    def on_delta(self, delta):
+        self.loop.call_soon_threadsafe(self._append, delta)
+
+    def _append(self, delta):
+        if not self._done.is_set():
+            self.text += delta
+
+    def finish(self, text):
+        # The returned summary is authoritative (cache hits and errors never stream)
+        self.text = text
+        self._done.set()
+
+    async def run(self):
+        msg = await send_text(self.message, STREAM_PLACEHOLDER)
+        self._sent.append([msg, STREAM_PLACEHOLDER])
+        while not self._done.is_set():
+            try:
+                await asyncio.wait_for(self._done.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self._render()
+
+    async def _render(self):
+        text = self.text.strip()
+        if not text:
+            return
+        for i, chunk in enumerate(split_message(text)):
+            if i < len(self._sent):
+                msg, shown = self._sent[i]
+                if shown != chunk:
+                    await self._call(msg.edit_text, chunk)
+                    self._sent[i][1] = chunk
+            else:
+                msg = await self._call(self.message.reply_text, chunk, "telegram.send")
+                if msg is not None:
+                    self._sent.append([msg, chunk])
+
+    async def _call(self, fn, text, name="telegram.edit"):
+        for _ in range(3):
+            try:
+                with span(name):
+                    return await fn(text)
+            except RetryAfter as e:
+                await asyncio.sleep(float(getattr(e, "retry_after", 1)))
+            except BadRequest:
+                return None  # e.g. "message is not modified"
+        return None
+
+
+def run_blocking(loop, fn, *args):
+    # run_in_executor does not carry contextvars over, so the trace would be lost
+    return loop.run_in_executor(None, contextvars.copy_context().run, fn, *args)
+
+async def send_text(message, text):
+    with span("telegram.send"):
+        return await message.reply_text(text)
+
+async def reply_summary(update, summarize, stream=STREAM_REPLIES):
+    """
+    Runs `summarize(on_delta)` off the event loop and sends the result, streaming
+    it into an edited message when enabled.
+    """
+    loop = asyncio.get_running_loop()
+    if not stream:
+        summary = await run_blocking(loop, summarize, None)
+        await send_text(update.message, summary)
+        return summary
+
+    reply = StreamingReply(update.message, loop)
+    task = asyncio.create_task(reply.run())
+    try:
+        summary = await run_blocking(loop, summarize, reply.on_delta)
+    except Exception as e:
+        summary = f"AI summary failed: {e}"
+    reply.finish(summary)
+    await task
+    return summary
+
+async def send_budget_reminder(update, context, remaining_percent, chat_used=0):
     message = f"⚠️ Reminder: You only have {remaining_percent:.1f}% of your OpenAI token budget left!"
-    await update.message.reply_text(message)
+    if chat_used:
+        message += f" This chat has used {chat_used:,} tokens."
+    await send_text(update.message, message)
+
+async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+    # One trace per incoming message: every span below, in any thread, is attached to it.
+    # Provider calls share one deadline; whatever is not in by then is reported missing
+    words = (update.message.text or "").strip().upper().split()
+    command = "summary" if words == ["SUMMARY"] else "tickers"
+    chat_id = update.effective_chat.id if update.effective_chat else None
+    with trace(command, chat_id=chat_id, tickers=len(words) if command == "tickers" else 0), \
+            deadline(COMMAND_DEADLINE_SECONDS):
+        await _handle_message(update, context, *args, **kwargs)
 
-async def message_handler(
+async def _handle_message(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
     startup_warnings,
@@ -16,58 +143,219 @@ async def message_handler(
     clean_tickers,
     get_stock_package,
     summarize_stocks,
-    TOP_N_TRENDING=10
+    get_stock_packages=None,
+    build_summary_packages=None,
+    snapshot=None,
+    summarize_tickers=None,
+    alerts=None,
+    digest=None,
+    TOP_N_TRENDING=10,
+    TOP_N_SUMMARY=5
 ):
     text = (update.message.text or "").strip().upper()
     if not text: return
 
-    tokens_used = context.bot_data.get("tokens_used", 0)
-    primary_budget = load_primary_budget()  # <-- Always fetch latest value from file!
-    context.bot_data["primary_budget"] = primary_budget
+    chat_id = update.effective_chat.id if update.effective_chat else None
+    loop = asyncio.get_running_loop()
+
+    # Watchlist / alert / subscription commands need neither market data nor the LLM
+    for book in (alerts, digest):
+        if book is None:
+            continue
+        reply = await run_blocking(loop, book.handle, text, chat_id)
+        if reply is not None:
+            await send_text(update.message, reply)
+            return
+
+    ledger = get_ledger()
     threshold_percent = 10
+    budget_low = is_ledger_budget_low(ledger, threshold_percent)  # <-- Picks up budget edits via the file's mtime
+    tokens_used, primary_budget = ledger.mirror(context.bot_data)
 
-    # Budget check logic, only notify ONCE!
-    if is_token_budget_low(tokens_used, primary_budget, threshold_percent):
+    # Budget check logic, only notify ONCE! The flag is set before awaiting so
+    # another chat's handler can't send the reminder too
+    if budget_low:
         if not context.bot_data.get("reminder_sent"):
-            remaining_percent = 100 * (primary_budget - tokens_used) / primary_budget
-            await send_budget_reminder(update, context, remaining_percent)
             context.bot_data["reminder_sent"] = True
+            await send_budget_reminder(
+                update, context, remaining_budget_percent(tokens_used, primary_budget),
+                chat_tokens_used(ledger, chat_id) if chat_id is not None else 0
+            )
     else:
         context.bot_data["reminder_sent"] = False
 
-    # show warnings if any
+    # show warnings if any (to whoever writes first)
     if startup_warnings:
-        await update.message.reply_text("\n".join(startup_warnings))
+        warnings = list(startup_warnings)
         startup_warnings.clear()
+        await send_text(update.message, "\n".join(warnings))
+
+    # Provider calls block, so keep them off the event loop
+    if get_stock_packages is None:
+        get_stock_packages = lambda symbols: [get_stock_package(s) for s in symbols]
+
+    if text == "SUMMARY" and snapshot is not None:
+        # Served from the background snapshot when it is fresh
+        summary = snapshot.summary()
+        if summary:
+            await send_text(update.message, summary)
+            return
+        ready = snapshot.packages()
+        if ready:
+            generation, top, global_news = ready
+            summary = await reply_summary(update, lambda on_delta: summarize_stocks(
+                top, "Overall Market Summary", mode="summary", context=context,
+                global_news=global_news, on_delta=on_delta, chat_id=chat_id
+            ))
+            if not summary.startswith("AI summary failed"):
+                snapshot.store_summary(generation, summary)
+            return
 
     if text == "SUMMARY":
-        volume = clean_tickers(get_top_volume_tickers(TOP_N_TRENDING))
-        mentions = clean_tickers(get_most_mentioned_tickers(TOP_N_TRENDING))
+        volume, mentions = await asyncio.gather(
+            run_blocking(loop, get_top_volume_tickers, TOP_N_TRENDING),
+            run_blocking(loop, get_most_mentioned_tickers, TOP_N_TRENDING),
+        )
+        volume = clean_tickers(volume, strict=False)
+        mentions = clean_tickers(mentions)
         combined = list(dict.fromkeys(volume + mentions))
 
         if not combined:
-            await update.message.reply_text("⚠ Could not find valid tickers right now. Try again later.")
+            await send_text(update.message, "⚠ Could not find valid tickers right now. Try again later.")
             return
 
-        pkgs = [get_stock_package(s) for s in combined]
-        pkgs.sort(key=lambda x: (
-            abs(x.get("pct_1d") if isinstance(x.get("pct_1d"), (int,float)) else 0),
-            x.get("crowd", {}).get("mentions", 0)
-        ), reverse=True)
-        top5 = pkgs[:5]
-        summary = summarize_stocks(top5, "Overall Market Summary", mode="summary", context=context)  # <-- Pass context!
-        await update.message.reply_text(summary)
+        if build_summary_packages is not None:
+            top5 = await run_blocking(loop, build_summary_packages, combined, TOP_N_SUMMARY)
+        else:
+            pkgs = await run_blocking(loop, get_stock_packages, combined)
+            pkgs.sort(key=lambda x: (
+                abs(x.get("pct_1d") if isinstance(x.get("pct_1d"), (int,float)) else 0),
+                x.get("crowd", {}).get("mentions", 0)
+            ), reverse=True)
+            top5 = pkgs[:TOP_N_SUMMARY]
+        await reply_summary(update, lambda on_delta: summarize_stocks(
+            top5, "Overall Market Summary", mode="summary", context=context,
+            on_delta=on_delta, chat_id=chat_id
+        ))
         return
 
-    tickers = [t for t in text.split() if clean_tickers([t])]
+    # Typed symbols may be outside the bundled universe, so only the shape is checked.
+    # Repeats are dropped: the batch fetch returns one package per unique symbol
+    tickers = list(dict.fromkeys(t for t in text.split() if clean_tickers([t], strict=False)))
     if not tickers:
-        await update.message.reply_text("❌ No valid tickers found.")
+        await send_text(update.message, "❌ No valid tickers found.")
+        return
+
+    pkgs = await run_blocking(loop, get_stock_packages, tickers)
+    if len(tickers) == 1:
+        t, pkg = tickers[0], pkgs[0]
+        await reply_summary(update, lambda on_delta: summarize_stocks(
+            [pkg], f"Analysis for {t}", mode="ticker", context=context,
+            on_delta=on_delta, chat_id=chat_id
+        ))
+        return
+
+    if summarize_tickers is not None:
+        # One completion per batch of tickers, split back into per-ticker replies
+        summaries = await run_blocking(loop, summarize_tickers, pkgs, context, chat_id)
+        for t, summary in zip(tickers, summaries):
+            await send_text(update.message, f"📈 {t}\n\n{summary}")
+        return
+
+    for t, pkg in zip(tickers, pkgs):
+        summary = await run_blocking(loop, lambda: summarize_stocks(
+            [pkg], f"Analysis for {t}", mode="ticker", context=context, chat_id=chat_id
+        ))
+        await send_text(update.message, summary)
+
+async def enqueue_message(update, chat_queue, job):
+    """
+    Hands `job` to the per-chat queue and returns straight away, so one chat's
+    SUMMARY never holds up the others. Tells the user when they have to wait.
+    Returns the queue position (0 = started), or None if it was turned away.
+    """
+    chat_id = update.effective_chat.id if update.effective_chat else None
+    submitted = time.perf_counter()
+
+    async def timed_job():
+        METRICS.observe("investo_queue_wait_seconds", time.perf_counter() - submitted)
+        await job()
+
+    position = chat_queue.submit(chat_id, timed_job)
+    if position is None:
+        METRICS.inc("investo_messages_rejected_total")
+        await send_text(update.message, QUEUE_FULL)
+    elif position:
+        await send_text(update.message, f"⏳ Busy, queued at position {position}.")
+    return position
+
+async def refresh_snapshot_job(context: ContextTypes.DEFAULT_TYPE):
+    snapshot = context.job.data
+    loop = asyncio.get_running_loop()
+    try:
+        with trace("snapshot_refresh"):
+            await run_blocking(loop, snapshot.refresh)
+    except Exception as e:
+        print("Snapshot refresh failed:", e)
+
+async def alert_job(context: ContextTypes.DEFAULT_TYPE):
+    alerts, outbox = context.job.data
+    loop = asyncio.get_running_loop()
+    try:
+        with trace("alerts"):
+            fired = await run_blocking(loop, alerts.evaluate)
+    except Exception as e:
+        print("Alert check failed:", e)
         return
+    # Only chats with a rule that fired hear anything
+    chats = list(fired)
+    results = await asyncio.gather(
+        *(outbox.send(chat_id, "\n".join(fired[chat_id])) for chat_id in chats), return_exceptions=True
+    )
+    for chat_id, result in zip(chats, results):
+        if isinstance(result, Exception):
+            print(f"Alert for chat {chat_id} not sent:", result)
 
-    for t in tickers:
-        pkg = get_stock_package(t)
-        summary = summarize_stocks([pkg], f"Analysis for {t}", mode="ticker", context=context)  # <-- Pass context!
-        await update.message.reply_text(summary)
+def digest_title(at):
+    return "🌅 Morning digest" if at.hour < 12 else "🔔 Market close digest"
+
+async def digest_job(context: ContextTypes.DEFAULT_TYPE):
+    digest, outbox, title = context.job.data
+    chats = digest.chats()
+    if not chats:
+        return
+    loop = asyncio.get_running_loop()
+    # Composed once; every subscriber gets the same text
+    try:
+        with trace("digest", chats=len(chats)):
+            text = await run_blocking(loop, digest.compose, title, context)
+    except Exception as e:
+        print("Digest failed:", e)
+        return
+    if text is None:
+        return
+    results = await asyncio.gather(*(outbox.send(chat_id, text) for chat_id in chats), return_exceptions=True)
+    for chat_id, result in zip(chats, results):
+        if isinstance(result, Forbidden):
+            # Blocked by the user or removed from the group
+            digest.unsubscribe(chat_id)
+        elif isinstance(result, Exception):
+            print(f"Digest for chat {chat_id} not sent:", result)
+    METRICS.inc("investo_digests_total")
+
+def schedule_digests(job_queue, digest, outbox):
+    tz = ZoneInfo(DIGEST_TIMEZONE)
+    for spec in DIGEST_TIMES:
+        try:
+            at = day_time.fromisoformat(spec).replace(tzinfo=tz)
+        except ValueError:
+            print(f"Ignoring digest time {spec!r} (expected HH:MM)")
+            continue
+        # Trading days only (PTB counts 0 = Sunday)
+        job_queue.run_daily(
+            digest_job, time=at, days=(1, 2, 3, 4, 5),
+            data=(digest, outbox, digest_title(at)), name=f"digest-{spec}"
+        )
 
 def start_bot(
     config,
@@ -78,24 +366,77 @@ def start_bot(
     clean_tickers,
     summarize_stocks,
     tokens_used,
-    primary_budget
+    primary_budget,
+    get_stock_packages=None,
+    build_summary_packages=None,
+    snapshot=None,
+    tokens_saved=0,
+    summarize_tickers=None,
+    warm_up=None,
+    alerts=None,
+    digest=None
 ):
     from telegram.request import HTTPXRequest
 
+    async def post_init(app):
+        outbox.start()
+        if warm_up is not None:
+            # The bot is online at this point; heavy modules load while polling starts
+            timer = threading.Timer(WARM_UP_DELAY, warm_up)
+            timer.daemon = True
+            timer.start()
+
     request = HTTPXRequest(http_version="1.1")
-    app = Application.builder().token(config["TELEGRAM_BOT_TOKEN"]).request(request).build()
+    app = Application.builder().token(config["TELEGRAM_BOT_TOKEN"]).request(request).post_init(post_init).build()
+    outbox = Outbox(
+        app.bot, global_rate=OUTBOX_RATE, chat_interval=OUTBOX_CHAT_INTERVAL, group_interval=OUTBOX_GROUP_INTERVAL
+    )
 
     # Set persistent values when the bot starts
     app.bot_data["tokens_used"] = tokens_used
     app.bot_data["primary_budget"] = primary_budget
+    app.bot_data["tokens_saved"] = tokens_saved
+
+    if snapshot is not None:
+        if app.job_queue is None:
+            print("JobQueue unavailable (install python-telegram-bot[job-queue]); SUMMARY snapshot disabled.")
+            snapshot = None
+        else:
+            app.job_queue.run_repeating(
+                refresh_snapshot_job, interval=SNAPSHOT_REFRESH_SECONDS, first=5,
+                data=snapshot, name="summary-snapshot"
+            )
+
+    if alerts is not None and ALERT_POLL_SECONDS > 0:
+        if app.job_queue is None:
+            print("JobQueue unavailable (install python-telegram-bot[job-queue]); alerts will not be checked.")
+        else:
+            app.job_queue.run_repeating(
+                alert_job, interval=ALERT_POLL_SECONDS, first=30, data=(alerts, outbox), name="alerts"
+            )
 
+    if digest is not None and DIGEST_TIMES:
+        if app.job_queue is None:
+            print("JobQueue unavailable (install python-telegram-bot[job-queue]); no scheduled digest.")
+        else:
+            schedule_digests(app.job_queue, digest, outbox)
+
+    chat_queue = ChatQueue(max_active=CHAT_CONCURRENCY, max_pending=MAX_QUEUED_MESSAGES)
     app.add_handler(MessageHandler(
         filters.TEXT & ~filters.COMMAND,
-        lambda update, context: message_handler(
+        lambda update, context: enqueue_message(update, chat_queue, lambda: message_handler(
             update, context, startup_warnings, get_top_volume_tickers,
             get_most_mentioned_tickers, clean_tickers,
-            get_stock_package, summarize_stocks
-        )
+            get_stock_package, summarize_stocks,
+            get_stock_packages=get_stock_packages,
+            build_summary_packages=build_summary_packages,
+            snapshot=snapshot,
+            summarize_tickers=summarize_tickers,
+            alerts=alerts,
+            digest=digest,
+            TOP_N_TRENDING=TRENDING_TOP_N,
+            TOP_N_SUMMARY=SUMMARY_TOP_N
+        ))
     ))
-    print("Bot ready. Type 'SUMMARY' or a ticker like 'TSLA'.")
+    print("Bot ready. Type 'SUMMARY', a ticker like 'TSLA', 'WATCH TSLA' for alerts or 'SUBSCRIBE' for the digest.")
     app.run_polling()
\ No newline at end of file
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# The bot's modules import each other as top-level modules (run from Investo/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the tests off the real stores under ~/investment_news_bot. config reads
+# these at import, so they are set before any test module imports the bot
+_data = tempfile.mkdtemp(prefix="investo-tests-")
+os.environ["CACHE_DB_PATH"] = os.path.join(_data, "cache.sqlite3")
+os.environ["SENTIMENT_STORE_PATH"] = os.path.join(_data, "sentiment.json")
+os.environ["PRICE_STORE_PATH"] = os.path.join(_data, "prices.sqlite3")
@@ -0,0 +1,149 @@
+import pytest
+
+import alerts
+from alerts import ABOVE, BELOW, MOVE, SENTIMENT, AlertBook
+
+
+class Market:
+    """Stands in for the pipeline: quotes and crowd sentiment set by the test."""
+
+    def __init__(self, monkeypatch):
+        self.quotes = {}
+        self.crowds = {}
+        self.sentiment_calls = []
+        monkeypatch.setattr(alerts, "get_price_packages", self.get_price_packages)
+        monkeypatch.setattr(alerts, "get_crowd_sentiments", self.get_crowd_sentiments)
+
+    def get_price_packages(self, symbols):
+        return [{"symbol": s, "price": "N/A", **self.quotes.get(s, {})} for s in symbols]
+
+    def get_crowd_sentiments(self, symbols):
+        self.sentiment_calls.append(list(symbols))
+        return [self.crowds.get(s) for s in symbols]
+
+    def quote(self, symbol, price, pct_1d=0.0):
+        self.quotes[symbol] = {"price": price, "pct_1d": pct_1d}
+
+    def crowd(self, symbol, day, week):
+        """`day`/`week` are (bull, bear) vote counts for the 24h and 7d windows."""
+        self.crowds[symbol] = {"windows": {
+            "24h": {"bull": day[0], "bear": day[1]},
+            "7d": {"bull": week[0], "bear": week[1]},
+        }}
+
+
+@pytest.fixture
+def market(monkeypatch):
+    return Market(monkeypatch)
+
+
+def test_price_cross_fires_once_and_rearms(market):
+    book = AlertBook()
+    book.add(1, "AAPL", ABOVE, 200)
+    market.quote("AAPL", 190)
+    assert book.evaluate() == {}
+    market.quote("AAPL", 205)
+    assert book.evaluate() == {1: ["🔔 AAPL is above 200: now 205.00"]}
+    # Still above: no repeat
+    market.quote("AAPL", 210)
+    assert book.evaluate() == {}
+    # Back below re-arms it, the next cross fires again
+    market.quote("AAPL", 199)
+    assert book.evaluate() == {}
+    market.quote("AAPL", 201)
+    assert book.evaluate() == {1: ["🔔 AAPL is above 200: now 201.00"]}
+
+
+def test_below_fires_at_the_threshold(market):
+    book = AlertBook()
+    book.add(1, "MSFT", BELOW, 150)
+    market.quote("MSFT", 150)
+    assert book.evaluate() == {1: ["🔔 MSFT is below 150: now 150.00"]}
+    assert book.evaluate() == {}
+
+
+def test_move_fires_in_either_direction(market):
+    book = AlertBook()
+    book.add(1, "NVDA", MOVE, 5)
+    market.quote("NVDA", 100, pct_1d=-6.5)
+    assert book.evaluate() == {1: ["🔔 NVDA moved -6.50% today (price 100.00)"]}
+    market.quote("NVDA", 100, pct_1d=7)
+    assert book.evaluate() == {}
+    market.quote("NVDA", 100, pct_1d=1)
+    book.evaluate()
+    market.quote("NVDA", 100, pct_1d=5)
+    assert book.evaluate() == {1: ["🔔 NVDA moved +5.00% today (price 100.00)"]}
+
+
+def test_missing_data_neither_fires_nor_rearms(market):
+    book = AlertBook()
+    book.add(1, "AAPL", ABOVE, 200)
+    market.quote("AAPL", 205)
+    assert book.evaluate()
+    # A failed quote in between must not count as "back below"
+    market.quote("AAPL", "N/A")
+    assert book.evaluate() == {}
+    market.quote("AAPL", 206)
+    assert book.evaluate() == {}
+
+
+def test_alerts_go_to_their_own_chats(market):
+    book = AlertBook()
+    book.add(1, "AAPL", ABOVE, 200)
+    book.add(2, "AAPL", ABOVE, 100)
+    book.add(2, "MSFT", BELOW, 300)
+    market.quote("AAPL", 150)
+    market.quote("MSFT", 250)
+    assert book.evaluate() == {2: ["🔔 AAPL is above 100: now 150.00", "🔔 MSFT is below 300: now 250.00"]}
+
+
+def test_sentiment_swing(market):
+    book = AlertBook()
+    book.add(1, "AAPL", ABOVE, 1000)
+    book.add(1, "TSLA", SENTIMENT, 20)
+    market.quote("AAPL", 10)
+    market.quote("TSLA", 10)
+    market.crowd("TSLA", day=(9, 1), week=(50, 50))
+    assert book.evaluate() == {1: ["🔔 TSLA sentiment swung +40 pts bullish vs its 7-day level"]}
+    # Only the symbols with sentiment rules are looked up
+    assert market.sentiment_calls == [["TSLA"]]
+    assert book.evaluate() == {}
+
+
+def test_sentiment_needs_enough_votes(market):
+    book = AlertBook()
+    book.add(1, "TSLA", SENTIMENT, 20)
+    market.quote("TSLA", 10)
+    market.crowd("TSLA", day=(3, 0), week=(50, 50))
+    assert book.evaluate() == {}
+
+
+def test_armed_state_survives_a_restart(market, tmp_path):
+    path = str(tmp_path / "alerts.json")
+    book = AlertBook(path=path)
+    book.add(1, "AAPL", ABOVE, 200)
+    market.quote("AAPL", 205)
+    assert book.evaluate()
+    assert AlertBook(path=path).evaluate() == {}
+
+
+def test_removed_rules_stop_firing(market):
+    book = AlertBook()
+    rule_id = book.add(1, "AAPL", ABOVE, 200)
+    book.evaluate()  # compiles the rules
+    assert book.remove(1, rule_id=rule_id) == 1
+    market.quote("AAPL", 205)
+    assert book.evaluate() == {}
+
+
+def test_commands():
+    book = AlertBook(max_rules_per_chat=2)
+    assert book.handle("ALERT AAPL ABOVE 200", 1) == "🔔 Alert #1: AAPL above 200"
+    assert book.handle("alert msft move 5%", 1) == "🔔 Alert #2: MSFT moves 5% in a day"
+    assert book.handle("ALERT NVDA BELOW 100", 1) == "⚠ Alert limit reached."
+    assert book.handle("ALERT AAPL SIDEWAYS 1", 1) == alerts.HELP
+    assert book.handle("ALERTS", 1) == "#1 AAPL above 200\n#2 MSFT moves 5% in a day"
+    assert book.handle("UNALERT #1", 2) == "No such alert."
+    assert book.handle("UNALERT #1", 1) == "Alert removed."
+    assert book.handle("WATCHLIST", 1) == "👀 Watching: MSFT"
+    assert book.handle("hello", 1) is None
@@ -0,0 +1,97 @@
+import asyncio
+
+from utils.chat_queue import ChatQueue
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+def test_positions_count_only_jobs_ahead():
+    async def go():
+        q = ChatQueue(max_active=2, max_pending=10)
+        release = asyncio.Event()
+        order = []
+
+        def job(tag):
+            async def run_job():
+                order.append(tag)
+                await release.wait()
+            return run_job
+
+        positions = [q.submit(1, job("a1")), q.submit(2, job("b1"))]
+        positions.append(q.submit(3, job("c1")))  # waits for a slot behind nobody
+        positions.append(q.submit(1, job("a2")))  # behind c1 and its own chat
+        positions.append(q.submit(4, job("d1")))  # behind c1 only: a2 is chat 1's line
+        await asyncio.sleep(0)
+        release.set()
+        while q._workers:
+            await asyncio.sleep(0.01)
+        return positions, order
+
+    positions, order = run(go())
+    assert positions == [0, 0, 1, 2, 2]
+    assert order[:2] == ["a1", "b1"]
+    assert order.index("a1") < order.index("a2")
+    assert sorted(order) == ["a1", "a2", "b1", "c1", "d1"]
+
+
+def test_same_chat_jobs_run_in_order():
+    async def go():
+        q = ChatQueue(max_active=4)
+        done = []
+
+        def job(n):
+            async def run_job():
+                await asyncio.sleep(0.01 * (3 - n))
+                done.append(n)
+            return run_job
+
+        positions = [q.submit(1, job(n)) for n in range(3)]
+        while q._workers:
+            await asyncio.sleep(0.01)
+        return positions, done
+
+    positions, done = run(go())
+    assert positions == [0, 1, 2]
+    assert done == [0, 1, 2]
+
+
+def test_full_queue_refuses_work():
+    async def go():
+        q = ChatQueue(max_active=1, max_pending=2)
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+
+        positions = [q.submit(c, job) for c in (1, 2, 3, 4)]
+        release.set()
+        while q._workers:
+            await asyncio.sleep(0.01)
+        return positions, q.pending
+
+    positions, pending = run(go())
+    # Chat 1's job is handed a slot at once but only counts as started once it runs
+    assert positions == [0, 1, None, None]
+    assert pending == 0
+
+
+def test_a_failing_job_does_not_stop_its_chat():
+    async def go():
+        q = ChatQueue(max_active=1)
+        done = []
+
+        async def boom():
+            raise RuntimeError("boom")
+
+        async def ok():
+            done.append("ok")
+
+        q.submit(1, boom)
+        q.submit(1, ok)
+        while q._workers:
+            await asyncio.sleep(0.01)
+        return done
+
+    assert run(go()) == ["ok"]
@@ -0,0 +1,93 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import api.yfinance as yfinance
+import utils.circuit
+from utils.circuit import CircuitBreaker, CircuitOpen
+from utils.deadline import deadline
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        breaker.before()
+        breaker.failure()
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failures=3, reset_after=60)
+    fail(breaker, 2)
+    breaker.before()
+    breaker.success()  # a success resets the count
+    fail(breaker, 2)
+    assert breaker.state == "closed"
+    fail(breaker, 1)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+
+
+def test_one_probe_after_the_reset_time():
+    breaker = CircuitBreaker("test", failures=1, reset_after=0.05)
+    fail(breaker, 1)
+    time.sleep(0.06)
+    breaker.before()  # the probe
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_keeps_it_open():
+    breaker = CircuitBreaker("test", failures=1, reset_after=0.05)
+    fail(breaker, 1)
+    time.sleep(0.06)
+    fail(breaker, 1)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+
+
+def test_inconclusive_calls_do_not_count():
+    breaker = CircuitBreaker("test", failures=2, reset_after=60)
+    for _ in range(5):
+        breaker.before()
+        breaker.inconclusive()
+    assert breaker.state == "closed"
+
+
+def test_inconclusive_probe_lets_the_next_caller_probe():
+    breaker = CircuitBreaker("test", failures=1, reset_after=0.05)
+    fail(breaker, 1)
+    time.sleep(0.06)
+    breaker.before()
+    breaker.inconclusive()
+    assert breaker.state == "open"
+    breaker.before()  # not rejected: a new probe
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+@pytest.fixture
+def failing_download(monkeypatch):
+    def download(*args, **kwargs):
+        raise TimeoutError("read timed out")
+    monkeypatch.setattr(yfinance, "yf", SimpleNamespace(download=download))
+    monkeypatch.setattr(utils.circuit, "_breakers", {})
+    return utils.circuit.get_breaker("yfinance")
+
+
+def test_timeouts_cut_short_by_the_deadline_spare_the_breaker(failing_download):
+    for _ in range(failing_download.failures + 2):
+        with deadline(1), pytest.raises(TimeoutError):
+            yfinance._download(["AAPL"], period="1mo")
+    assert failing_download.state == "closed"
+
+
+def test_full_timeouts_open_the_breaker(failing_download):
+    for _ in range(failing_download.failures):
+        with pytest.raises(TimeoutError):
+            yfinance._download(["AAPL"], period="1mo")
+    assert failing_download.state == "open"
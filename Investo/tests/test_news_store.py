@@ -0,0 +1,40 @@
+import pytest
+
+from utils.news_store import NewsItem, NewsStore, same_story
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Fed holds rates steady, signals cuts later this year",
+     "Fed keeps rates steady and signals cuts later this year"),
+    ("Apple beats estimates as iPhone sales jump", "Apple tops estimates as iPhone sales jump"),
+    ("Tesla shares jump after delivery beat - Reuters", "Tesla shares jump after delivery beat | MarketWatch"),
+    ("Tesla shares jump after delivery beat", "Tesla shares jump after strong delivery beat"),
+])
+def test_reworded_copies_are_the_same_story(a, b):
+    assert same_story(NewsItem(0, a), NewsItem(0, b), 14)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Acme raises full-year guidance", "Acme cuts full-year guidance"),
+    ("Acme beats quarterly estimates", "Acme misses quarterly estimates"),
+    ("Nvidia upgraded to buy at Morgan Stanley", "Nvidia downgraded to sell at Morgan Stanley"),
+    ("Acme CEO to step down", "Acme CFO to step down"),
+])
+def test_opposite_or_swapped_meaning_is_kept_apart(a, b):
+    assert not same_story(NewsItem(0, a), NewsItem(0, b), 64)
+
+
+def test_store_keeps_one_copy_per_story():
+    store = NewsStore(max_items=10, max_feeds=5, max_distance=14)
+    raw = [
+        {"id": 1, "datetime": 100, "headline": "Fed holds rates steady, signals cuts later this year"},
+        {"id": 2, "datetime": 90, "headline": "Fed keeps rates steady and signals cuts later this year"},
+        {"id": 3, "datetime": 80, "headline": "Acme cuts full-year guidance"},
+        {"id": 4, "datetime": 70, "headline": "Acme raises full-year guidance"},
+    ]
+    assert store.refresh("general", lambda ts, id_: raw, max_age=0)
+    assert store.headlines("general", 10) == [
+        "Fed holds rates steady, signals cuts later this year",
+        "Acme cuts full-year guidance",
+        "Acme raises full-year guidance",
+    ]
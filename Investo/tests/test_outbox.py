@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+from telegram.error import Forbidden, RetryAfter
+
+from utils.outbox import Outbox
+
+
+class FakeBot:
+    """Records (chat_id, text, monotonic time) per send; `errors` are raised first, in order."""
+
+    def __init__(self, errors=None):
+        self.sent = []
+        self.calls = 0
+        self.errors = list(errors or [])
+
+    async def send_message(self, chat_id, text):
+        self.calls += 1
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+def run(bot, sends, **kwargs):
+    """Queues `sends` ([(chat_id, text)]) on a fresh Outbox and waits for all of them."""
+    async def go():
+        outbox = Outbox(bot, **kwargs)
+        outbox.start()
+        try:
+            futures = [outbox.send(chat_id, text) for chat_id, text in sends]
+            return await asyncio.wait_for(asyncio.gather(*futures, return_exceptions=True), 10)
+        finally:
+            outbox._task.cancel()
+    return asyncio.run(go())
+
+
+def test_global_rate_limit():
+    bot = FakeBot()
+    results = run(bot, [(c, "hi") for c in range(1, 7)], global_rate=3, chat_interval=0)
+    assert results == [None] * 6
+    times = [t for _, _, t in bot.sent]
+    assert max(times[:3]) - times[0] < 0.5
+    assert times[3] - times[0] >= 0.95
+
+
+def test_per_chat_interval():
+    bot = FakeBot()
+    run(bot, [(1, "a"), (1, "b"), (1, "c")], chat_interval=0.2)
+    assert [text for _, text, _ in bot.sent] == ["a", "b", "c"]
+    times = [t for _, _, t in bot.sent]
+    assert all(b - a >= 0.19 for a, b in zip(times, times[1:]))
+
+
+def test_groups_use_the_group_interval():
+    bot = FakeBot()
+    run(bot, [(-100, "a"), (-100, "b")], chat_interval=0, group_interval=0.3)
+    assert bot.sent[1][2] - bot.sent[0][2] >= 0.29
+
+
+def test_chats_are_served_round_robin():
+    bot = FakeBot()
+    run(bot, [(1, "a1"), (1, "a2"), (2, "b1"), (2, "b2")], chat_interval=0.1)
+    assert [chat for chat, _, _ in bot.sent] == [1, 2, 1, 2]
+
+
+def test_long_text_is_split_in_order():
+    bot = FakeBot()
+    run(bot, [(1, "x" * 5000)], chat_interval=0)
+    assert [len(text) for _, text, _ in bot.sent] == [4096, 904]
+
+
+def test_flood_wait_pauses_and_retries():
+    bot = FakeBot(errors=[RetryAfter(0.3)])
+    start = time.monotonic()
+    results = run(bot, [(1, "a"), (1, "b")], chat_interval=0)
+    assert results == [None, None]
+    assert bot.calls == 3
+    assert [text for _, text, _ in bot.sent] == ["a", "b"]
+    # Nothing goes out until the pause Telegram asked for is over
+    assert all(t - start >= 0.29 for _, _, t in bot.sent)
+
+
+def test_flood_wait_gives_up_after_max_retries():
+    bot = FakeBot(errors=[RetryAfter(0.05)] * 3)
+    (result,) = run(bot, [(1, "a")], chat_interval=0, max_retries=2)
+    assert isinstance(result, RetryAfter)
+    assert bot.calls == 3
+    assert bot.sent == []
+
+
+def test_other_errors_fail_without_retry():
+    bot = FakeBot(errors=[Forbidden("blocked")])
+    results = run(bot, [(1, "a"), (2, "b")], chat_interval=0)
+    assert isinstance(results[0], Forbidden)
+    assert results[1] is None
+    assert bot.calls == 2
+    assert [chat for chat, _, _ in bot.sent] == [2]
+
+
+@pytest.mark.parametrize("chunks", [1, 2])
+def test_failed_message_drops_its_remaining_chunks(chunks):
+    bot = FakeBot(errors=[Forbidden("blocked")])
+    results = run(bot, [(1, "x" * 4096 * chunks), (1, "next")], chat_interval=0)
+    assert isinstance(results[0], Forbidden)
+    assert results[1] is None
+    assert [text for _, text, _ in bot.sent] == ["next"]
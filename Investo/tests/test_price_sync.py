@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import api.yfinance as yfinance
+from utils.price_store import PriceStore
+
+
+class History:
+    """Daily closes per symbol up to today, served like a grouped yf.download."""
+
+    def __init__(self, monkeypatch, days=30):
+        self.index = pd.date_range(end=pd.Timestamp(date.today()), periods=days)
+        self.closes = {}
+        self.calls = []  # (symbols, start or period)
+        self.fail = False
+        monkeypatch.setattr(yfinance, "_download", self.download)
+
+    def set(self, symbol, start=100.0):
+        self.closes[symbol] = pd.Series([start + i for i in range(len(self.index))], index=self.index)
+
+    def download(self, symbols, period=None, start=None, **kwargs):
+        self.calls.append((list(symbols), start or period))
+        if self.fail:
+            return pd.DataFrame()
+        index = self.index if start is None else self.index[self.index >= pd.Timestamp(start)]
+        data = {}
+        for s in symbols:
+            if s in self.closes:
+                for field in ("Open", "High", "Low", "Close", "Volume"):
+                    data[(field, s)] = self.closes[s].reindex(index)
+        frame = pd.DataFrame(data, index=index)
+        frame.columns = pd.MultiIndex.from_tuples(frame.columns)
+        return frame
+
+
+@pytest.fixture
+def history(monkeypatch, tmp_path):
+    monkeypatch.setattr(yfinance, "_store", PriceStore(str(tmp_path / "prices.sqlite3"), retention_days=60))
+    return History(monkeypatch)
+
+
+def test_first_sync_backfills_then_fetches_from_the_last_completed_session(history):
+    history.set("AAPL")
+    assert yfinance._sync_store(["AAPL"]) == {"AAPL"}
+    assert history.calls == [(["AAPL"], str(yfinance._store.first_day_to_fetch()))]
+    # Today's bar is stored but still moving: the next sync starts from yesterday
+    yfinance._sync_store(["AAPL"])
+    assert history.calls[1] == (["AAPL"], str(date.today() - timedelta(days=1)))
+
+
+def test_a_moving_today_bar_is_not_an_adjustment(history):
+    history.set("AAPL")
+    yfinance._sync_store(["AAPL"])
+    history.closes["AAPL"].iloc[-1] *= 1.05
+    yfinance._sync_store(["AAPL"])
+    assert len(history.calls) == 2  # no full refetch
+    assert yfinance._store.closes(["AAPL"])["AAPL"].iloc[-1] == history.closes["AAPL"].iloc[-1]
+
+
+def test_an_adjusted_history_is_refetched(history):
+    history.set("AAPL")
+    yfinance._sync_store(["AAPL"])
+    history.closes["AAPL"] /= 2  # a 2:1 split rewrites every adjusted close
+    assert yfinance._sync_store(["AAPL"]) == {"AAPL"}
+    assert history.calls[-1] == (["AAPL"], str(yfinance._store.first_day_to_fetch()))
+    stored = yfinance._store.closes(["AAPL"])["AAPL"]
+    assert stored.iloc[0] == history.closes["AAPL"].iloc[0]
+
+
+def test_a_quiet_download_failure_does_not_serve_stored_closes(history):
+    history.set("AAPL")
+    yfinance._sync_store(["AAPL"])
+    history.fail = True
+    (quote,) = yfinance._store_changes(["AAPL"])
+    assert quote["price"] == "N/A"
+    assert history.calls[-1] == (["AAPL"], "1mo")
+
+
+def test_store_changes_uses_the_stored_history(history):
+    history.set("AAPL")
+    history.set("MSFT", start=200.0)
+    aapl, msft = yfinance._store_changes(["AAPL", "MSFT"])
+    last = history.closes["AAPL"]
+    assert aapl["price"] == last.iloc[-1]
+    assert aapl["pct_1d"] == round((last.iloc[-1] - last.iloc[-2]) / last.iloc[-2] * 100, 2)
+    assert msft["price"] == history.closes["MSFT"].iloc[-1]
@@ -0,0 +1,108 @@
+import time
+
+from utils.sentiment_store import RollingCounts, SentimentTracker
+
+
+def counts(mentions, bull, bear):
+    return {"mentions": mentions, "bull": bull, "bear": bear}
+
+
+def test_counts_within_the_window():
+    w = RollingCounts(bucket_seconds=60, buckets=5)
+    w.add(0, 1, 1, 0)
+    w.add(30, 1, 0, 1)
+    w.add(150, 2, 1, 0)
+    assert w.counts(200) == counts(4, 2, 1)
+
+
+def test_buckets_leave_the_window():
+    w = RollingCounts(bucket_seconds=60, buckets=5)
+    w.add(0, 1, 1, 0)     # bucket 0
+    w.add(120, 1, 0, 1)   # bucket 2
+    assert w.counts(299) == counts(2, 1, 1)   # buckets 0-4
+    assert w.counts(300) == counts(1, 0, 1)   # bucket 0 gone
+    assert w.counts(420) == counts(0, 0, 0)   # bucket 2 gone
+    assert w.to_json() == []
+
+
+def test_ring_slots_are_reused():
+    w = RollingCounts(bucket_seconds=10, buckets=3)
+    for ts in range(0, 100, 10):
+        w.add(ts, 1, 1, 0)
+    # Only buckets 7, 8 and 9 are left
+    assert w.counts(95) == counts(3, 3, 0)
+    assert len(w.to_json()) == 3
+
+
+def test_late_events_count_only_inside_the_window():
+    w = RollingCounts(bucket_seconds=60, buckets=5)
+    w.add(600, 1, 0, 0)   # bucket 10; window is buckets 6-10
+    w.add(400, 1, 1, 0)   # bucket 6: still inside
+    w.add(350, 1, 0, 1)   # bucket 5: too old
+    assert w.counts(600) == counts(2, 1, 0)
+
+
+def test_reading_does_not_move_the_window_back():
+    w = RollingCounts(bucket_seconds=60, buckets=5)
+    w.add(600, 1, 1, 0)
+    assert w.counts(0) == counts(1, 1, 0)
+
+
+def test_round_trip_through_json():
+    w = RollingCounts(bucket_seconds=60, buckets=5)
+    w.add(0, 1, 1, 0)
+    w.add(60, 2, 0, 2)
+    w.add(240, 1, 1, 0)
+    copy = RollingCounts(bucket_seconds=60, buckets=5)
+    copy.load(w.to_json())
+    assert copy.counts(240) == w.counts(240) == counts(4, 2, 2)
+    assert copy.counts(360) == w.counts(360) == counts(1, 1, 0)
+
+
+def message(mid, sentiment=None):
+    created = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    entities = {"sentiment": {"basic": sentiment}} if sentiment else {}
+    return {"id": mid, "created_at": created, "entities": entities}
+
+
+def test_tracker_only_counts_new_messages():
+    tracker = SentimentTracker()
+    cursors = []
+
+    def fetch(cursor):
+        cursors.append(cursor)
+        return [message(2, "Bullish"), message(1, "Bearish")]
+
+    first = tracker.get("AAPL", fetch, max_age=0)
+    second = tracker.get("AAPL", fetch, max_age=0)
+    assert cursors == [None, 2]
+    assert first["24h"] == second["24h"] == counts(2, 1, 1)
+
+
+def test_tracker_keeps_stale_counts_when_a_fetch_fails():
+    tracker = SentimentTracker()
+    tracker.get("AAPL", lambda cursor: [message(1, "Bullish")], max_age=0)
+    assert tracker.get("AAPL", lambda cursor: None, max_age=0)["1h"] == counts(1, 1, 0)
+    assert tracker.get("MSFT", lambda cursor: None, max_age=0) is None
+
+
+def test_tracker_evicts_the_least_recently_used():
+    tracker = SentimentTracker(max_symbols=2)
+    fetch = lambda cursor: [message(1, "Bullish")]
+    tracker.get("AAPL", fetch, max_age=0)
+    tracker.get("MSFT", fetch, max_age=0)
+    tracker.get("AAPL", fetch, max_age=60)  # touched: MSFT is now the oldest
+    tracker.get("NVDA", fetch, max_age=0)
+    assert sorted(tracker.to_json()["symbols"]) == ["AAPL", "NVDA"]
+
+
+def test_tracker_state_survives_a_restart(tmp_path):
+    path = str(tmp_path / "sentiment.json")
+    tracker = SentimentTracker(path)
+    tracker.get("AAPL", lambda cursor: [message(5, "Bearish")], max_age=0)
+    assert tracker.flush()
+    cursors = []
+    restored = SentimentTracker(path)
+    result = restored.get("AAPL", lambda cursor: cursors.append(cursor) or [], max_age=0)
+    assert cursors == [5]
+    assert result["7d"] == counts(1, 0, 1)
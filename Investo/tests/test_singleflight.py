@@ -0,0 +1,83 @@
+import threading
+import time
+
+from utils.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight(ttl=0)
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    for t in [leader] + followers:
+        t.join(2)
+    assert calls == [1]
+    assert sorted(results) == [("value", False)] + [("value", True)] * 3
+
+
+def test_results_are_reused_for_the_ttl():
+    flight = SingleFlight(ttl=0.1)
+    calls = []
+    fn = lambda: calls.append(1) or len(calls)
+    assert flight.do("k", fn) == (1, False)
+    assert flight.do("k", fn) == (1, True)
+    assert flight.do("other", fn) == (2, False)
+    time.sleep(0.11)
+    assert flight.do("k", fn) == (3, False)
+
+
+def test_results_failing_cache_if_are_not_kept():
+    flight = SingleFlight(ttl=60)
+    assert flight.do("k", lambda: "", cache_if=bool) == ("", False)
+    assert flight.do("k", lambda: "ok", cache_if=bool) == ("ok", False)
+    assert flight.do("k", lambda: "new", cache_if=bool) == ("ok", True)
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight(ttl=60)
+    started = threading.Event()
+
+    def boom():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", boom)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=call)
+    follower.start()
+    for t in (leader, follower):
+        t.join(2)
+    assert errors == ["boom", "boom"]
+    assert flight.do("k", lambda: "ok") == ("ok", False)
+
+
+def test_oldest_results_are_dropped_past_max_entries():
+    flight = SingleFlight(ttl=60, max_entries=2)
+    for key in ("a", "b", "c"):
+        flight.do(key, lambda: key)
+    assert flight.do("a", lambda: "again") == ("again", False)
+    assert flight.do("c", lambda: "again") == ("c", True)
+
@@ -4,5 +4,30 @@ def is_token_budget_low(tokens_used, primary_budget, threshold_percent=10):
     """
     if primary_budget == 0:
         return True  # Avoid division by zero; treat as low budget.
-    remaining_percent = 100 * (primary_budget - tokens_used) / primary_budget
-    return remaining_percent <= threshold_percent
\ No newline at end of file
+    return remaining_budget_percent(tokens_used, primary_budget) <= threshold_percent
+
+def remaining_budget_percent(tokens_used, primary_budget):
+    """
+    Returns the remaining share of the budget in percent (0 for an empty budget).
+    """
+    if primary_budget == 0:
+        return 0.0
+    return 100 * (primary_budget - tokens_used) / primary_budget
+
+def is_ledger_budget_low(ledger, threshold_percent=10):
+    """
+    Same check as is_token_budget_low, against the in-memory token ledger.
+    """
+    return is_token_budget_low(ledger.tokens_used, ledger.refresh_budget(), threshold_percent)
+
+def chat_tokens_used(ledger, chat_id):
+    """
+    Tokens spent on behalf of one chat.
+    """
+    return ledger.chat_total(chat_id)
+
+def mode_tokens_used(ledger, mode):
+    """
+    Tokens spent per request mode ("summary", "ticker", "multi").
+    """
+    return ledger.mode_total(mode)
@@ -0,0 +1,181 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from config import CACHE_TTLS, CACHE_MAX_ENTRIES, CACHE_DB_PATH, CACHE_DISK_MIN_TTL, CACHE_FLUSH_SECONDS
+
+DEFAULT_TTL = 60
+
+
+class ResponseCache:
+    """
+    Bounded in-memory LRU with per-entry expiry, optionally backed by SQLite so
+    entries survive a service restart. Values must be JSON-serialisable.
+    Only entries with a TTL of at least `min_disk_ttl` go to disk, and they are
+    written behind in one transaction at most every `flush_seconds`. SQLite I/O
+    never happens under the in-memory lock.
+    """
+
+    def __init__(self, max_entries=512, db_path=None, min_disk_ttl=300, flush_seconds=5):
+        self.max_entries = max_entries
+        self.min_disk_ttl = min_disk_ttl
+        self.flush_seconds = flush_seconds
+        self._mem = OrderedDict()  # (source, key) -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._pending = {}  # (source, key) -> (expires_at, value), waiting for the next flush
+        self._flushed_at = time.time()
+        self._db_lock = threading.Lock()
+        self._db = None
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                # WAL + NORMAL: a commit appends to the log instead of syncing the whole file
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "source TEXT, key TEXT, expires_at REAL, value TEXT, "
+                    "PRIMARY KEY (source, key))"
+                )
+                self._db.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+                self._db.commit()
+                atexit.register(self.flush)
+            except Exception:
+                self._db = None  # run memory-only rather than fail startup
+
+    def _count(self, source, field):
+        s = self._stats.setdefault(source, {"hits": 0, "misses": 0, "disk_hits": 0})
+        s[field] += 1
+
+    def get(self, source, key):
+        """Returns (hit, value)."""
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get((source, key))
+            if entry and entry[0] > now:
+                self._mem.move_to_end((source, key))
+                self._count(source, "hits")
+                return True, entry[1]
+            if entry:
+                del self._mem[(source, key)]
+            if self._db is None or ttl_for(source) < self.min_disk_ttl:
+                self._count(source, "misses")
+                return False, None
+
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT expires_at, value FROM cache WHERE source=? AND key=?",
+                    (source, key),
+                ).fetchone()
+        except Exception:
+            row = None
+        with self._lock:
+            if row and row[0] > now:
+                value = json.loads(row[1])
+                self._put_mem(source, key, row[0], value)
+                self._count(source, "hits")
+                self._count(source, "disk_hits")
+                return True, value
+            self._count(source, "misses")
+            return False, None
+
+    def set(self, source, key, value, ttl):
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._put_mem(source, key, expires_at, value)
+            # Short-lived entries would be stale before any restart could use them
+            if self._db is not None and ttl >= self.min_disk_ttl:
+                self._pending[(source, key)] = (expires_at, value)
+        if self._pending and time.time() - self._flushed_at >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Writes the pending entries to disk in one transaction."""
+        if self._db is None or not self._db_lock.acquire(blocking=False):
+            return  # another thread is already writing
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushed_at = time.time()
+            if pending:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                    [(s, k, exp, json.dumps(v)) for (s, k), (exp, v) in pending.items()],
+                )
+                self._db.commit()
+        except Exception:
+            pass
+        finally:
+            self._db_lock.release()
+
+    def _put_mem(self, source, key, expires_at, value):
+        self._mem[(source, key)] = (expires_at, value)
+        self._mem.move_to_end((source, key))
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._pending.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {src: dict(s) for src, s in self._stats.items()}
+
+
+# Opened on first use rather than at import, so importing a provider touches no files
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                max_entries=CACHE_MAX_ENTRIES, db_path=CACHE_DB_PATH,
+                min_disk_ttl=CACHE_DISK_MIN_TTL, flush_seconds=CACHE_FLUSH_SECONDS,
+            )
+        return _cache
+
+def cache_stats():
+    return _cache.stats() if _cache is not None else {}
+
+def make_key(*parts):
+    return json.dumps(parts, sort_keys=True, default=str)
+
+def ttl_for(source):
+    return CACHE_TTLS.get(source, DEFAULT_TTL)
+
+def cached(source, cache_if=bool):
+    """
+    Caches a provider function's result under `source`, with that source's TTL.
+    Results failing `cache_if` (by default empty ones, which usually mean the
+    upstream call failed) are returned but not stored.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = make_key(fn.__module__, fn.__name__, args, kwargs)
+            cache = get_cache()
+            hit, value = cache.get(source, key)
+            if hit:
+                return value
+            value = fn(*args, **kwargs)
+            if cache_if(value):
+                cache.set(source, key, value, ttl_for(source))
+            return value
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
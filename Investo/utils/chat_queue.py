@@ -0,0 +1,68 @@
+import asyncio
+from collections import deque
+
+
+class ChatQueue:
+    """
+    Runs jobs for different chats concurrently, at most `max_active` at a time,
+    while jobs from the same chat run one after another in arrival order.
+    No more than `max_pending` jobs may wait; past that, `submit` refuses work.
+    Must be used from the event loop thread.
+    """
+
+    def __init__(self, max_active=4, max_pending=20):
+        self.max_active = max(1, max_active)
+        self.max_pending = max_pending
+        self.pending = 0  # submitted, not started yet
+        self._slots = None
+        self._jobs = {}     # chat_id -> deque of coroutine functions
+        self._workers = {}  # chat_id -> task draining that chat's jobs
+        self._running = set()  # chats whose worker holds (or was just given) a slot
+
+    def submit(self, chat_id, job):
+        """
+        Queues `job` (a coroutine function taking no arguments). Returns 0 if it
+        starts right away, its position in line if it has to wait, or None if
+        the queue is full. The position counts the jobs ahead of this one: the
+        other chats waiting for a slot and this chat's own waiting jobs.
+        """
+        if self.pending >= self.max_pending:
+            return None
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_active)
+        waiting = len(self._workers) - len(self._running)  # chats in line for a slot
+        self.pending += 1
+        if chat_id in self._workers:
+            jobs = self._jobs[chat_id]
+            jobs.append(job)
+            return len(jobs) + waiting - (chat_id not in self._running)
+        if len(self._workers) < self.max_active:
+            # A slot is free: the job is handed to the worker and never waits
+            self._jobs[chat_id] = deque()
+            self._running.add(chat_id)
+            self._workers[chat_id] = asyncio.create_task(self._drain(chat_id, job))
+            return 0
+        self._jobs[chat_id] = deque([job])
+        self._workers[chat_id] = asyncio.create_task(self._drain(chat_id))
+        return waiting + 1
+
+    async def _drain(self, chat_id, job=None):
+        jobs = self._jobs[chat_id]
+        try:
+            while job is not None or jobs:
+                async with self._slots:
+                    if job is None:
+                        job = jobs.popleft()  # left queued until it starts, so submit can count it
+                    self.pending -= 1
+                    self._running.add(chat_id)
+                    try:
+                        await job()
+                    except Exception as e:
+                        print(f"Job for chat {chat_id} failed:", e)
+                    finally:
+                        self._running.discard(chat_id)
+                        job = None
+        finally:
+            # Nothing can be submitted between the last `while` check and here
+            del self._workers[chat_id]
+            del self._jobs[chat_id]
@@ -0,0 +1,94 @@
+import threading
+import time
+from config import BREAKER_FAILURES, BREAKER_RESET_SECONDS
+from utils.metrics import METRICS
+
+
+class ProviderUnavailable(Exception):
+    """A provider call produced no usable data (as opposed to an empty result)."""
+
+
+class CircuitOpen(ProviderUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `failures` consecutive errors from a provider. After
+    `reset_after` seconds one probe call is let through: success closes the
+    circuit again, failure keeps it open for another `reset_after`.
+    """
+
+    def __init__(self, name, failures=5, reset_after=30):
+        self.name = name
+        self.failures = failures
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._errors = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._probing else "open"
+
+    def before(self):
+        """Raises CircuitOpen unless a call may go ahead now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_after:
+                self._probing = True  # this caller is the probe
+                return
+        METRICS.inc("investo_circuit_rejections_total", provider=self.name)
+        raise CircuitOpen(f"{self.name} is failing, skipped")
+
+    def success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"Circuit for {self.name} closed")
+            self._errors = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._errors += 1
+            if self._probing or (self._opened_at is None and self._errors >= self.failures):
+                if self._opened_at is None:
+                    print(f"Circuit for {self.name} opened after {self._errors} errors")
+                    METRICS.inc("investo_circuit_opened_total", provider=self.name)
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def inconclusive(self):
+        """The call ended for a reason of ours (a timeout cut short by the request deadline)."""
+        with self._lock:
+            self._probing = False  # says nothing about the provider; the next caller may probe
+
+    def call(self, fn, *args, **kwargs):
+        self.before()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.failure()
+            raise
+        self.success()
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+        return _breakers[name]
+
+def breaker_states():
+    with _breakers_lock:
+        return {name: b.state for name, b in _breakers.items()}
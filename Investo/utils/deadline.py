@@ -0,0 +1,42 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Absolute time.monotonic() by which the current command must be done, or None.
+# Pool threads see it because fan_out/run_blocking run work in a copy of the context
+_deadline = contextvars.ContextVar("investo_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@contextmanager
+def deadline(seconds):
+    """Bounds everything under this block (including nested deadlines) to `seconds` from now."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining(default=None):
+    """Seconds left before the deadline (never negative), or `default` if there is none."""
+    at = _deadline.get()
+    if at is None:
+        return default
+    return max(0.0, at - time.monotonic())
+
+def budget(timeout):
+    """`timeout` cut down to the time left; raises DeadlineExceeded once it is spent."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("request deadline passed")
+    return min(timeout, left)
@@ -0,0 +1,51 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import PROVIDER_CONCURRENCY, DEFAULT_PROVIDER_CONCURRENCY
+
+# One small pool per provider: the pool size *is* the concurrency cap, and a
+# slow provider can never starve the others of worker threads.
+_executors = {}
+_lock = threading.Lock()
+
+def _executor(provider):
+    with _lock:
+        ex = _executors.get(provider)
+        if ex is None:
+            workers = max(1, PROVIDER_CONCURRENCY.get(provider, DEFAULT_PROVIDER_CONCURRENCY))
+            ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"fanout-{provider}")
+            _executors[provider] = ex
+        return ex
+
+def submit(provider, fn, *args, **kwargs):
+    # Runs under a copy of the caller's context so spans land in its trace
+    ctx = contextvars.copy_context()
+    return _executor(provider).submit(ctx.run, fn, *args, **kwargs)
+
+def fan_out(calls):
+    """
+    Runs (provider, fn, args) calls concurrently and returns their results in input order.
+    Do not call this from inside a provider pool for the same provider.
+    """
+    futures = [submit(provider, fn, *args) for provider, fn, args in calls]
+    return [f.result() for f in futures]
+
+def fan_out_settled(calls, timeout=None):
+    """
+    Like fan_out, but never raises: returns (ok, result-or-exception) pairs in
+    input order. Calls not done after `timeout` seconds come back as
+    (False, TimeoutError): those still queued are cancelled, running ones are
+    left to finish in the background.
+    """
+    futures = [submit(provider, fn, *args) for provider, fn, args in calls]
+    wait(futures, timeout=timeout)
+    out = []
+    for f in futures:
+        if not f.done():
+            f.cancel()
+            out.append((False, TimeoutError("deadline passed")))
+        elif f.exception() is not None:
+            out.append((False, f.exception()))
+        else:
+            out.append((True, f.result()))
+    return out
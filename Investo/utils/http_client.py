@@ -0,0 +1,124 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from config import HTTP_TIMEOUT, HTTP_POOL_SIZE, HTTP_MAX_RETRIES, RATE_LIMITS
+from utils.circuit import get_breaker
+from utils.deadline import budget, remaining
+from utils.metrics import METRICS, span
+
+
+class RateLimitExceeded(requests.RequestException):
+    pass
+
+
+class TokenBucket:
+    """Allows `rate` requests per `per` seconds, with bursts up to `rate`."""
+
+    def __init__(self, rate, per):
+        self.capacity = float(rate)
+        self.tokens = float(rate)
+        self.refill_per_sec = rate / float(per)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+        self.updated = now
+
+    def acquire(self, max_wait):
+        """Takes one token, sleeping if needed. Raises RateLimitExceeded past `max_wait`."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = max(0.0, self.blocked_until - now)
+                if not wait:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.refill_per_sec
+            if now + wait > deadline:
+                raise RateLimitExceeded(f"rate limit wait of {wait:.1f}s exceeds {max_wait}s")
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def _bucket(host):
+    with _buckets_lock:
+        if host not in _buckets:
+            limit = RATE_LIMITS.get(host)
+            _buckets[host] = TokenBucket(*limit) if limit else None
+        return _buckets[host]
+
+def _retry_after(resp, attempt):
+    value = resp.headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return min(30.0, 2.0 ** attempt)
+
+def get_session():
+    return _session
+
+def http_get(url, params=None, headers=None, timeout=None):
+    """
+    GET through the shared keep-alive session, honouring the per-host rate
+    limit and backing off on 429 / Retry-After. Timeouts are cut to the
+    current request deadline, and a host that keeps failing is skipped by its
+    circuit breaker (CircuitOpen). Returns the final response.
+    """
+    timeout = HTTP_TIMEOUT if timeout is None else timeout
+    host = urlsplit(url).hostname
+    bucket = _bucket(host)
+    breaker = get_breaker(host)
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        if bucket is not None:
+            bucket.acquire(max_wait=budget(timeout))
+        request_timeout = budget(timeout)
+        breaker.before()
+        try:
+            with span(f"http.{host}"):
+                resp = _session.get(url, params=params, headers=headers, timeout=request_timeout)
+        except requests.RequestException as e:
+            if isinstance(e, requests.Timeout) and request_timeout < timeout:
+                breaker.inconclusive()  # one request's tight deadline is not the host failing
+            else:
+                breaker.failure()
+            raise
+        if resp.status_code >= 500:
+            breaker.failure()
+        else:
+            breaker.success()
+        METRICS.inc("investo_http_responses_total", host=host, status=resp.status_code)
+        if resp.status_code != 429 or attempt == HTTP_MAX_RETRIES:
+            return resp
+        wait = _retry_after(resp, attempt)
+        if bucket is not None:
+            bucket.pause(wait)
+        if wait > min(timeout, remaining(timeout)):
+            return resp
+        if bucket is None:
+            time.sleep(wait)
+    return resp
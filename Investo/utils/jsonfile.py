@@ -0,0 +1,29 @@
+import json
+import os
+import tempfile
+
+
+def read_json(path):
+    """The JSON object stored at `path`, or {} if it is missing or unreadable."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def write_json_atomic(path, data):
+    # Write to a temp file in the same directory, then rename over the target,
+    # so a crash mid-write can never leave a truncated file behind.
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,49 @@
+import importlib
+from config import LAZY_IMPORTS
+from utils.metrics import span
+
+
+class LazyModule:
+    """
+    Stands in for a module and imports it the first time one of its attributes
+    is used, so the bot can start polling before pandas, openai & co. load.
+    Attribute writes (monkeypatching) go through to the real module.
+    """
+
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with span(f"import.{self._name}"):
+                module = importlib.import_module(self._name)
+            object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_import(name):
+    """A LazyModule for `name`, or the module itself when LAZY_IMPORTS=0."""
+    return LazyModule(name) if LAZY_IMPORTS else importlib.import_module(name)
+
+def preload(names):
+    """Imports modules ahead of first use; failures are left for the real caller to hit."""
+    for name in names:
+        try:
+            with span(f"import.{name}"):
+                importlib.import_module(name)
+        except Exception as e:
+            print(f"Warm-up import of {name} failed:", e)
@@ -0,0 +1,18 @@
+TELEGRAM_MAX_LEN = 4096
+
+def split_message(text, limit=TELEGRAM_MAX_LEN):
+    """
+    Splits text into chunks of at most `limit` characters, preferring to break
+    at a newline. A chunk only depends on the text before its end, so the split
+    stays stable while the text grows (needed for streamed edits).
+    """
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text or not chunks:
+        chunks.append(text)
+    return chunks
@@ -0,0 +1,225 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from config import TRACE_LOG, TRACE_SLOW_SECONDS, TRACE_KEEP
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Registry:
+    """
+    Counters and latency histograms kept as plain dicts under one lock; an
+    update is a dict lookup and an increment. `render()` emits Prometheus text.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self._collectors = []
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels(labels))
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            h[i] += 1
+            h[-1] += seconds
+
+    def add_collector(self, fn):
+        """`fn()` returns (name, labels dict, value) gauges, read at scrape time."""
+        self._collectors.append(fn)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+        lines = []
+        for name in sorted({n for n, _ in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_fmt_labels(labels)} {value}")
+        for name in sorted({n for n, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (n, labels), h in sorted(histograms.items()):
+                if n != name:
+                    continue
+                total = 0
+                for bound, count in zip(self.buckets + ("+Inf",), h[:-1]):
+                    total += count
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', str(bound))])} {total}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-1]:.6f}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {total}")
+        gauges = {}
+        for fn in self._collectors:
+            try:
+                for name, labels, value in fn():
+                    gauges.setdefault(name, []).append((_labels(labels), value))
+            except Exception as e:
+                print("Metrics collector failed:", e)
+        for name, rows in sorted(gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in rows:
+                lines.append(f"{name}{_fmt_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+# ---------- Spans and traces ----------
+_trace = contextvars.ContextVar("investo_trace", default=None)
+_recent = deque(maxlen=TRACE_KEEP)
+
+
+class Trace:
+    def __init__(self, name, **attrs):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.seconds = None
+        self.error = None
+        self.spans = []  # appended from pool threads; list.append is atomic
+
+    def to_dict(self):
+        return {
+            "trace": self.id, "name": self.name, "started": round(self.started, 3),
+            "seconds": None if self.seconds is None else round(self.seconds, 4),
+            "error": self.error, **self.attrs, "spans": list(self.spans),
+        }
+
+
+def _is_timeout(e):
+    return isinstance(e, (TimeoutError, FutureTimeout, requests.Timeout))
+
+def _record(name, elapsed, error, offset):
+    METRICS.observe("investo_span_seconds", elapsed, span=name)
+    if error is not None:
+        kind = "timeouts" if _is_timeout(error) else "errors"
+        METRICS.inc(f"investo_{kind}_total", span=name)
+    t = _trace.get()
+    if t is not None:
+        entry = {"span": name, "at": round(offset - t.started, 4), "seconds": round(elapsed, 4)}
+        if error is not None:
+            entry["error"] = type(error).__name__
+        t.spans.append(entry)
+
+@contextmanager
+def span(name):
+    """Times the block into investo_span_seconds{span=name} and the current trace."""
+    offset = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        _record(name, time.perf_counter() - start, error, offset)
+
+def timed(name):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def trace(name, **attrs):
+    """
+    Collects every span finished in this context (including pool threads that
+    run under a copy of it) into one per-request trace.
+    """
+    t = Trace(name, **attrs)
+    token = _trace.set(t)
+    start = time.perf_counter()
+    try:
+        yield t
+    except Exception as e:
+        t.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _trace.reset(token)
+        t.seconds = time.perf_counter() - start
+        METRICS.observe("investo_request_seconds", t.seconds, request=name)
+        _recent.append(t)
+        if TRACE_LOG or t.seconds >= TRACE_SLOW_SECONDS:
+            print("trace", json.dumps(t.to_dict()))
+
+def current_trace():
+    return _trace.get()
+
+def recent_traces():
+    return [t.to_dict() for t in list(_recent)]
+
+# ---------- HTTP endpoint ----------
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics"):
+            body, ctype = METRICS.render(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.startswith("/traces"):
+            body, ctype = json.dumps(recent_traces()), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass  # scrapes every few seconds would flood the journal
+
+def serve_metrics(host, port):
+    """Serves /metrics and /traces from a daemon thread. Returns the server, or None."""
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        print(f"Metrics endpoint disabled ({host}:{port}): {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print("Metrics on http://%s:%d/metrics" % server.server_address[:2])
+    return server
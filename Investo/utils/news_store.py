@@ -0,0 +1,172 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# " - Reuters", " | MarketWatch": the same story syndicated under another outlet's name
+_OUTLET_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{2,40}$")
+STOP_WORDS = frozenset(
+    "a an the of to in on for and as at by is are with after over new its it this that "
+    "from amid says said plans".split()
+)
+
+def _stem(word):
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > 4 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+# Words that flip a headline's meaning when swapped for each other
+_OPPOSITE_WORDS = (
+    ("raise raises raised hike hikes hiked", "cut cuts lower lowers lowered"),
+    ("beat beats", "miss misses missed"),
+    ("rise rises rose gain gains", "fall falls fell loss losses lose loses"),
+    ("surge surges surged jump jumps jumped soar soars soared",
+     "plunge plunges plunged drop drops dropped sink sinks sank tumble tumbles tumbled"),
+    ("up higher high above", "down lower low below"),
+    ("upgrade upgrades upgraded", "downgrade downgrades downgraded"),
+    ("buy buys bought", "sell sells sold"),
+    ("approve approves approved", "reject rejects rejected block blocks blocked"),
+    ("bullish", "bearish"),
+    ("profit profits", "loss losses"),
+    ("win wins won", "lose loses lost"),
+    ("open opens opened", "close closes closed"),
+)
+OPPOSITES = frozenset(
+    frozenset((_stem(x), _stem(y)))
+    for left, right in _OPPOSITE_WORDS for x in left.split() for y in right.split()
+)
+# A single swapped word in a headline with fewer shared words than this is the news itself
+MIN_SHARED_FOR_SWAP = 4
+
+def content_words(headline):
+    text = _OUTLET_SUFFIX.sub("", headline).lower()
+    return frozenset(_stem(w) for w in _TOKEN_RE.findall(text) if w not in STOP_WORDS)
+
+def simhash(headline, words=None):
+    """64-bit similarity hash of a headline's content words; similar headlines differ in few bits."""
+    words = content_words(headline) if words is None else words
+    weights = [0] * 64
+    for w in words:
+        h = int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(64):
+            weights[i] += 1 if h >> i & 1 else -1
+    return sum(1 << i for i in range(64) if weights[i] > 0)
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def same_story(a, b, max_distance):
+    """
+    Near in simhash, and the words that differ don't change the meaning:
+    no opposite pair ("raises" / "cuts" guidance) and, in a short headline,
+    no lone swapped word ("CEO" / "CFO" to step down). Reworded copies from
+    other outlets ("holds" / "keeps" rates steady, ...) still match.
+    """
+    if hamming(a.fingerprint, b.fingerprint) > max_distance:
+        return False
+    only_a, only_b = a.words - b.words, b.words - a.words
+    if not only_a or not only_b:
+        return True  # one adds words to the other
+    if any(frozenset((x, y)) in OPPOSITES for x in only_a for y in only_b):
+        return False
+    if len(only_a) == len(only_b) == 1 and len(a.words & b.words) < MIN_SHARED_FOR_SWAP:
+        return False
+    return True
+
+class NewsItem:
+    __slots__ = ("ts", "headline", "words", "fingerprint")
+
+    def __init__(self, ts, headline):
+        self.ts = ts
+        self.headline = headline
+        self.words = content_words(headline)
+        self.fingerprint = simhash(headline, self.words)
+
+
+class _Feed:
+    def __init__(self):
+        self.items = []  # newest first
+        self.max_ts = 0
+        self.max_id = 0
+        self.ids_at_max = set()  # ids already seen with timestamp == max_ts
+        self.fetched_at = 0.0
+        self.fetching = threading.Lock()
+
+
+class NewsStore:
+    """
+    Headlines per feed (a symbol, or "general"), newest first, at most
+    `max_items` each and `max_feeds` feeds (least recently used dropped).
+    Each feed remembers the newest timestamp and id it has seen so refreshes
+    only ask for what is new. A headline within `max_distance` simhash bits of a
+    stored one, differing in no meaning-changing word, is treated as the same story
+    from another outlet and dropped.
+    """
+
+    def __init__(self, max_items=40, max_feeds=500, max_distance=14):
+        self.max_items = max_items
+        self.max_feeds = max_feeds
+        self.max_distance = max_distance
+        self._feeds = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _feed(self, key):
+        with self._lock:
+            feed = self._feeds.get(key)
+            if feed is None:
+                feed = self._feeds[key] = _Feed()
+                while len(self._feeds) > self.max_feeds:
+                    self._feeds.popitem(last=False)
+            self._feeds.move_to_end(key)
+            return feed
+
+    def refresh(self, key, fetch, max_age):
+        """
+        Calls `fetch(max_ts, max_id)` if the feed is older than `max_age`
+        seconds. It returns raw Finnhub items (dicts with id, datetime and
+        headline) newer than the watermark, or None on failure. Returns False
+        if the feed has never been fetched successfully.
+        """
+        feed = self._feed(key)
+        with feed.fetching:
+            if time.time() - feed.fetched_at >= max_age:
+                items = fetch(feed.max_ts, feed.max_id)
+                if items is not None:
+                    with self._lock:
+                        self._add(feed, items)
+                        feed.fetched_at = time.time()
+            return feed.fetched_at > 0
+
+    def _add(self, feed, raw):
+        mark = feed.max_ts
+        added = []
+        for item in sorted(raw, key=lambda x: x.get("datetime") or 0, reverse=True):
+            headline = (item.get("headline") or "").strip()
+            ts = item.get("datetime") or 0
+            # Below the watermark everything was seen (or evicted); at it, only unseen ids are new
+            if not headline or ts < mark or (ts == mark and item.get("id") in feed.ids_at_max):
+                continue
+            item = NewsItem(ts, headline)
+            if any(same_story(item, x, self.max_distance) for x in added + feed.items):
+                continue
+            added.append(item)
+
+        newest = max([mark] + [item.get("datetime") or 0 for item in raw])
+        at_newest = {item.get("id") for item in raw if (item.get("datetime") or 0) == newest}
+        feed.ids_at_max = at_newest | feed.ids_at_max if newest == mark else at_newest
+        feed.max_ts = newest
+        feed.max_id = max([feed.max_id] + [item.get("id") or 0 for item in raw])
+        if added:
+            feed.items = sorted(added + feed.items, key=lambda x: x.ts, reverse=True)[:self.max_items]
+
+    def headlines(self, key, limit, since=0):
+        feed = self._feed(key)
+        with self._lock:
+            return [x.headline for x in feed.items if x.ts >= since][:limit]
+
+    def clear(self):
+        with self._lock:
+            self._feeds.clear()
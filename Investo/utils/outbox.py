@@ -0,0 +1,123 @@
+import asyncio
+import time
+from collections import deque
+from telegram.error import RetryAfter
+from utils.messages import split_message
+from utils.metrics import METRICS, span
+
+
+class _Outgoing:
+    def __init__(self, chunks, future):
+        self.chunks = deque(chunks)
+        self.future = future
+        self.retries = 0
+
+
+class Outbox:
+    """
+    Queue for everything the bot sends on its own (digests, alerts), kept under
+    Telegram's limits: at most `global_rate` messages a second overall and one
+    per `chat_interval` seconds per chat (`group_interval` for groups). Chats
+    are served round-robin, so a broadcast reaches everyone at the same pace.
+    Text is split at 4096 characters; on a flood wait (RetryAfter) all sending
+    pauses for as long as Telegram asks and the chunk is retried.
+    Runs on the bot's event loop: call start() from there.
+    """
+
+    def __init__(self, bot, global_rate=30, chat_interval=1.0, group_interval=3.0, max_retries=3):
+        self.bot = bot
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.max_retries = max_retries
+        self._queues = {}  # chat_id -> deque of _Outgoing
+        self._ready = deque()  # chats with something queued and nothing in flight
+        self._next_at = {}  # chat_id -> monotonic time it may be sent to again
+        self._sent = deque()  # monotonic times of the sends in the last second
+        self._hold_until = 0.0
+        self._tasks = set()  # sends in flight (the loop only keeps weak references)
+        self._wake = None
+        self._task = None
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def send(self, chat_id, text):
+        """Queues `text`; the returned future resolves once every chunk is sent, or with the error."""
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+            self._ready.append(chat_id)
+        queue.append(_Outgoing(split_message(text), future))
+        self._wake.set()
+        return future
+
+    def _next_chat(self, now):
+        for _ in range(len(self._ready)):
+            chat_id = self._ready.popleft()
+            if self._next_at.get(chat_id, 0) <= now:
+                return chat_id
+            self._ready.append(chat_id)
+        return None
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] >= 1.0:
+                self._sent.popleft()
+            wait = self._hold_until - now
+            if len(self._sent) >= self.global_rate:
+                wait = max(wait, self._sent[0] + 1.0 - now)
+            chat_id = self._next_chat(now) if wait <= 0 else None
+            if chat_id is None:
+                if wait <= 0 and self._ready:
+                    wait = min(self._next_at.get(c, 0) for c in self._ready) - now
+                if not self._queues:
+                    # Idle: forget per-chat pauses that have run out
+                    self._next_at = {c: t for c, t in self._next_at.items() if t > now}
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), wait if wait > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._sent.append(now)
+            task = asyncio.create_task(self._deliver(chat_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, chat_id):
+        queue = self._queues[chat_id]
+        msg = queue[0]
+        error = None
+        try:
+            with span("telegram.send"):
+                await self.bot.send_message(chat_id, msg.chunks[0])
+            msg.chunks.popleft()
+            METRICS.inc("investo_outbox_sent_total")
+        except RetryAfter as e:
+            METRICS.inc("investo_outbox_flood_waits_total")
+            self._hold_until = max(self._hold_until, time.monotonic() + float(e.retry_after))
+            msg.retries += 1
+            if msg.retries > self.max_retries:
+                error = e
+        except Exception as e:
+            error = e
+
+        if error is not None or not msg.chunks:
+            queue.popleft()
+            if not msg.future.done():
+                if error is None:
+                    msg.future.set_result(None)
+                else:
+                    METRICS.inc("investo_outbox_failed_total")
+                    msg.future.set_exception(error)
+        interval = self.group_interval if chat_id < 0 else self.chat_interval
+        self._next_at[chat_id] = time.monotonic() + interval
+        if queue:
+            self._ready.append(chat_id)
+        else:
+            del self._queues[chat_id]
+        self._wake.set()
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+from utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+PRUNE_EVERY = 3600
+
+
+class PriceStore:
+    """
+    Daily OHLCV bars per symbol in SQLite, kept for `retention_days`.
+    Callers fetch only the bars after a symbol's last stored day and read
+    closes back as a (days x symbols) frame.
+    """
+
+    def __init__(self, path, retention_days=400):
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bars ("
+            "symbol TEXT, day TEXT, open REAL, high REAL, low REAL, close REAL, volume REAL, "
+            "PRIMARY KEY (symbol, day)) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    def first_day_to_fetch(self):
+        return date.today() - timedelta(days=self.retention_days)
+
+    def last_days(self, symbols, before=None):
+        """Each symbol's last stored day, or its last one before day `before` (a date string)."""
+        marks = ",".join("?" * len(symbols))
+        cutoff = " AND day < ?" if before else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT symbol, MAX(day) FROM bars WHERE symbol IN ({marks}){cutoff} GROUP BY symbol",
+                list(symbols) + ([before] if before else []),
+            ).fetchall()
+        return {s: d for s, d in rows if d}
+
+    def close_on(self, symbol, day):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT close FROM bars WHERE symbol=? AND day=?", (symbol, day)
+            ).fetchone()
+        return row[0] if row else None
+
+    def upsert(self, symbol, bars):
+        """`bars`: frame indexed by date with Open/High/Low/Close/Volume columns."""
+        rows = [
+            (symbol, str(ts.date()), _f(r.get("Open")), _f(r.get("High")), _f(r.get("Low")),
+             _f(r.get("Close")), _f(r.get("Volume")))
+            for ts, r in bars.iterrows()
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def drop(self, symbol):
+        with self._lock:
+            self._db.execute("DELETE FROM bars WHERE symbol=?", (symbol,))
+            self._db.commit()
+
+    def closes(self, symbols):
+        marks = ",".join("?" * len(symbols))
+        with self._lock:
+            frame = pd.read_sql_query(
+                f"SELECT symbol, day, close FROM bars WHERE symbol IN ({marks}) ORDER BY day",
+                self._db, params=list(symbols),
+            )
+        if frame.empty:
+            return pd.DataFrame(columns=list(symbols), dtype=float)
+        wide = frame.pivot(index="day", columns="symbol", values="close")
+        wide.index = pd.to_datetime(wide.index)
+        return wide.reindex(columns=list(symbols))
+
+    def prune(self):
+        now = time.time()
+        if now - self._last_prune < PRUNE_EVERY:
+            return
+        self._last_prune = now
+        cutoff = str(self.first_day_to_fetch())
+        with self._lock:
+            self._db.execute("DELETE FROM bars WHERE day < ?", (cutoff,))
+            self._db.commit()
+
+
+def _f(v):
+    try:
+        v = float(v)
+        return None if v != v else v
+    except (TypeError, ValueError):
+        return None
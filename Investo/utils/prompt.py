@@ -0,0 +1,181 @@
+import math
+import re
+import threading
+
+_encoding = None  # loaded on first use; False when tiktoken is unavailable
+
+SHORT_HEADLINE = 90
+MIN_GLOBAL_NEWS = 2
+NEAR_DUP_JACCARD = 0.8
+
+_savings = {}
+_savings_lock = threading.Lock()
+
+def _get_encoding():
+    # Exact counts when tiktoken is installed, a chars/4 estimate otherwise
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+def savings_totals():
+    """Cumulative prompt tokens saved per compaction step since startup."""
+    with _savings_lock:
+        return dict(_savings)
+
+def _words(headline):
+    return frozenset(re.findall(r"[a-z0-9]+", headline.lower()))
+
+def _is_near_dup(words, seen):
+    if not words:
+        return False
+    for other in seen:
+        union = len(words | other)
+        if union and len(words & other) / union >= NEAR_DUP_JACCARD:
+            return True
+    return False
+
+def _shorten(headline, limit=SHORT_HEADLINE):
+    if len(headline) <= limit:
+        return headline
+    cut = headline.rfind(" ", 0, limit)
+    return headline[: cut if cut > 0 else limit].rstrip(",;:- ") + "…"
+
+def scale_max_tokens(max_tokens, remaining_percent, min_tokens=120, full_percent=25, step=50):
+    """
+    Full allowance while at least `full_percent` of the budget is left; below
+    that, shrink it in proportion to the share that remains, down to `min_tokens`.
+    Rounded down to `step` tokens so the prompt (and its cache key) only
+    changes now and then, not after every completion.
+    """
+    if remaining_percent >= full_percent:
+        return max_tokens
+    scaled = int(max_tokens * max(0, remaining_percent) / full_percent) // step * step
+    return max(min(min_tokens, max_tokens), scaled)
+
+
+class PromptBuilder:
+    """
+    Holds the prompt as structured parts (header, per-stock data, global news)
+    so headlines can be deduplicated, shortened or dropped before rendering.
+    Rendering matches the plain string-concatenated prompt format.
+    """
+
+    def __init__(self, header):
+        self.header = header
+        self.stocks = []  # [(data dict, [headlines])]
+        self.global_news = None
+        self.stats = {}
+
+    def add_stock(self, d):
+        self.stocks.append((d, list(d.get("news") or [])))
+
+    def set_global_news(self, headlines):
+        self.global_news = list(headlines or [])
+
+    def _stock_lines(self, d, news):
+        crowd = d.get("crowd", {})
+        windows = crowd.get("windows")
+        missing = d.get("missing") or []
+        trend = ""
+        if windows:
+            trend = f" (mentions 1h={windows['1h']['mentions']}, 7d={windows['7d']['mentions']})"
+        sentiment = "n/a" if "sentiment" in missing else (
+            f"mentions={crowd.get('mentions')}, bull={crowd.get('bull')}, bear={crowd.get('bear')}{trend}"
+        )
+        lines = (
+            f"- {d['shortName']} ({d['symbol']}): Price {d['price']}, "
+            f"1d {d['pct_1d']}%, 5d {d['pct_5d']}%, 1m {d['pct_1m']}%\n"
+            f"  Crowd sentiment 24h: {sentiment}\n"
+            f"  News: " + "; ".join(news or ["n/a" if "news" in missing else "No major news"]) + "\n"
+        )
+        if missing:
+            # Parts a provider failed to deliver before the deadline
+            lines += f"  Missing: {', '.join(missing)} (unavailable, do not guess)\n"
+        return lines
+
+    def render(self):
+        prompt = self.header
+        for d, news in self.stocks:
+            prompt += self._stock_lines(d, news)
+        if self.global_news is not None:
+            prompt += "\n### Global Market News:\n" + "; ".join(self.global_news)
+        return prompt
+
+    def _step(self, name, fn):
+        before = count_tokens(self.render())
+        fn()
+        saved = before - count_tokens(self.render())
+        self.stats[name] = self.stats.get(name, 0) + saved
+        return before - saved
+
+    def _dedupe(self):
+        # Earlier (higher-ranked) stocks keep a story; later copies and global repeats go
+        seen = []
+        for _, news in self.stocks:
+            kept = []
+            for h in news:
+                w = _words(h)
+                if not _is_near_dup(w, seen):
+                    seen.append(w)
+                    kept.append(h)
+            news[:] = kept
+        if self.global_news is not None:
+            kept = []
+            for h in self.global_news:
+                w = _words(h)
+                if not _is_near_dup(w, seen):
+                    seen.append(w)
+                    kept.append(h)
+            self.global_news = kept
+
+    def _shorten_all(self):
+        for _, news in self.stocks:
+            news[:] = [_shorten(h) for h in news]
+        if self.global_news is not None:
+            self.global_news = [_shorten(h) for h in self.global_news]
+
+    def _drop_one_headline(self):
+        # Lowest value first: the last headline of the stock with the most
+        # headlines, preferring lower-ranked stocks on ties
+        best = None
+        for i, (_, news) in enumerate(self.stocks):
+            if news and (best is None or len(news) >= len(self.stocks[best][1])):
+                best = i
+        if best is None:
+            return False
+        self.stocks[best][1].pop()
+        return True
+
+    def build(self, target_tokens=None):
+        """Returns the compacted prompt; per-step savings are left in self.stats."""
+        tokens = self._step("dedupe", self._dedupe)
+        if target_tokens and tokens > target_tokens:
+            tokens = self._step("shorten", self._shorten_all)
+        if target_tokens and tokens > target_tokens and self.global_news:
+            def drop_global():
+                while len(self.global_news) > MIN_GLOBAL_NEWS and count_tokens(self.render()) > target_tokens:
+                    self.global_news.pop()
+            tokens = self._step("drop_global", drop_global)
+        if target_tokens and tokens > target_tokens:
+            def drop_news():
+                while count_tokens(self.render()) > target_tokens and self._drop_one_headline():
+                    pass
+                while self.global_news and count_tokens(self.render()) > target_tokens:
+                    self.global_news.pop()
+            tokens = self._step("drop_news", drop_news)
+
+        with _savings_lock:
+            for name, saved in self.stats.items():
+                _savings[name] = _savings.get(name, 0) + saved
+        return self.render()
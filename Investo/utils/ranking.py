@@ -0,0 +1,41 @@
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+def _numeric(pkgs, key):
+    vals = [p.get(key) for p in pkgs]
+    arr = np.array([v if isinstance(v, (int, float)) else 0.0 for v in vals], dtype=float)
+    return np.nan_to_num(arr)
+
+# --- Scorers: take a list of price packages, return one score per package ---
+
+def score_abs_move(pkgs):
+    return np.abs(_numeric(pkgs, "pct_1d"))
+
+def score_momentum(pkgs):
+    return np.abs(_numeric(pkgs, "pct_1d")) + 0.5 * np.abs(_numeric(pkgs, "pct_5d"))
+
+SCORERS = {
+    "abs_move": score_abs_move,
+    "momentum": score_momentum,
+}
+
+def get_scorer(name):
+    return SCORERS.get(name, score_abs_move)
+
+def top_k(pkgs, k, scorer=score_abs_move):
+    """
+    Returns the k highest-scoring packages, best first, without sorting the whole list.
+    Ties keep the input order, so results are deterministic.
+    """
+    n = len(pkgs)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    scores = np.asarray(scorer(pkgs), dtype=float)
+    kth = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[: k - len(above)]
+    idx = np.concatenate([above, ties])
+    idx = idx[np.lexsort((idx, -scores[idx]))]
+    return [pkgs[i] for i in idx]
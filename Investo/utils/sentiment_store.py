@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from utils.jsonfile import read_json, write_json_atomic
+
+
+class RollingCounts:
+    """
+    Mentions/bull/bear over the last `buckets * bucket_seconds` seconds, kept
+    as a ring of time buckets plus running totals, so reading the window is O(1)
+    and buckets leaving it are subtracted as time moves on.
+    """
+
+    def __init__(self, bucket_seconds, buckets):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.head = None  # index of the newest bucket
+        self.slots = [None] * buckets  # i -> [bucket index, mentions, bull, bear]
+        self.totals = [0, 0, 0]
+
+    def _advance(self, index):
+        if self.head is not None and index <= self.head:
+            return
+        for i, slot in enumerate(self.slots):
+            if slot is not None and slot[0] <= index - self.buckets:
+                for k in range(3):
+                    self.totals[k] -= slot[k + 1]
+                self.slots[i] = None
+        self.head = index
+
+    def add(self, ts, mentions, bull, bear):
+        index = int(ts // self.bucket_seconds)
+        self._advance(index)
+        if index <= self.head - self.buckets:
+            return  # older than the window
+        pos = index % self.buckets
+        slot = self.slots[pos]
+        if slot is None or slot[0] != index:
+            slot = self.slots[pos] = [index, 0, 0, 0]
+        for k, v in enumerate((mentions, bull, bear)):
+            slot[k + 1] += v
+            self.totals[k] += v
+
+    def counts(self, now):
+        self._advance(int(now // self.bucket_seconds))
+        mentions, bull, bear = self.totals
+        return {"mentions": mentions, "bull": bull, "bear": bear}
+
+    def to_json(self):
+        return [s for s in self.slots if s is not None]
+
+    def load(self, slots):
+        for index, mentions, bull, bear in sorted(slots):
+            self.add(index * self.bucket_seconds, mentions, bull, bear)
+
+
+# name -> (bucket seconds, bucket count)
+WINDOWS = {"1h": (300, 12), "24h": (3600, 24), "7d": (3600, 168)}
+# Not fetched for this long and every window is empty, so nothing is worth keeping
+IDLE_SECONDS = 7 * 86400
+
+
+class SymbolSentiment:
+    def __init__(self):
+        self.cursor = None  # newest StockTwits message id seen
+        self.fetched_at = 0.0
+        self.windows = {name: RollingCounts(*spec) for name, spec in WINDOWS.items()}
+        self.fetching = threading.Lock()  # one fetch per symbol at a time
+
+    def add(self, ts, bull, bear):
+        for w in self.windows.values():
+            w.add(ts, 1, bull, bear)
+
+    def counts(self, now):
+        return {name: w.counts(now) for name, w in self.windows.items()}
+
+
+def _timestamp(created_at, default):
+    try:
+        return datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return default
+
+
+class SentimentTracker:
+    """
+    Per-symbol StockTwits sentiment, updated incrementally: each refresh asks
+    only for messages newer than the last id seen and adds them to rolling
+    1h/24h/7d windows. At most `max_symbols` are kept (least recently used
+    dropped). State is saved to `path` (JSON) at most every `flush_seconds`,
+    and at exit by the caller.
+    """
+
+    def __init__(self, path=None, flush_seconds=60, max_symbols=500):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.max_symbols = max_symbols
+        self._symbols = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flushed_at = time.time()
+        if path:
+            self._load(read_json(path))
+
+    def _load(self, data):
+        saved = (data.get("symbols") or {}).items()
+        idle_since = time.time() - IDLE_SECONDS
+        # Oldest first, so the most recently fetched end up the last to be evicted
+        for symbol, state in sorted(saved, key=lambda kv: kv[1].get("fetched_at", 0.0)):
+            if state.get("fetched_at", 0.0) < idle_since:
+                continue
+            s = self._get(symbol)
+            s.cursor = state.get("cursor")
+            s.fetched_at = state.get("fetched_at", 0.0)
+            for name, slots in (state.get("windows") or {}).items():
+                if name in s.windows:
+                    s.windows[name].load(slots)
+
+    def _get(self, symbol):
+        with self._lock:
+            s = self._symbols.get(symbol)
+            if s is None:
+                s = self._symbols[symbol] = SymbolSentiment()
+                while len(self._symbols) > self.max_symbols:
+                    self._symbols.popitem(last=False)
+                    self._dirty = True
+            self._symbols.move_to_end(symbol)
+            return s
+
+    def get(self, symbol, fetch, max_age):
+        """
+        Window counts for `symbol`. If they are older than `max_age` seconds,
+        `fetch(cursor)` is called first and must return the messages newer than
+        `cursor` (None on failure); stale counts are returned if it fails.
+        """
+        s = self._get(symbol)
+        with s.fetching:
+            if time.time() - s.fetched_at >= max_age:
+                messages = fetch(s.cursor)
+                if messages is not None:
+                    with self._lock:
+                        self._apply(s, messages, time.time())
+        with self._lock:
+            counts = s.counts(time.time()) if s.cursor is not None else None
+        self._maybe_flush()
+        return counts
+
+    def _apply(self, s, messages, now):
+        newest = s.cursor or 0
+        for m in messages:
+            mid = m.get("id") or 0
+            if s.cursor is not None and mid <= s.cursor:
+                continue  # already counted
+            basic = ((m.get("entities") or {}).get("sentiment") or {}).get("basic")
+            s.add(_timestamp(m.get("created_at"), now), basic == "Bullish", basic == "Bearish")
+            newest = max(newest, mid)
+        s.cursor = newest
+        s.fetched_at = now
+        self._dirty = True
+
+    def to_json(self):
+        with self._lock:
+            return {"symbols": {
+                symbol: {
+                    "cursor": s.cursor, "fetched_at": s.fetched_at,
+                    "windows": {name: w.to_json() for name, w in s.windows.items()},
+                }
+                for symbol, s in self._symbols.items() if s.cursor is not None
+            }}
+
+    def _maybe_flush(self):
+        if self._dirty and time.time() - self._flushed_at >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        if not self.path or not self._dirty:
+            return False
+        self._dirty = False
+        self._flushed_at = time.time()
+        try:
+            write_json_atomic(self.path, self.to_json())
+        except Exception as e:
+            self._dirty = True
+            print("Sentiment store write failed:", e)
+            return False
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._symbols.clear()
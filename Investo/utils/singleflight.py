@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Deduplicates calls by key: concurrent callers share one in-flight call,
+    and a successful result is reused for `ttl` seconds.
+    """
+
+    def __init__(self, ttl=120, max_entries=64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._results = OrderedDict()  # key -> (created_at, value)
+
+    def do(self, key, fn, cache_if=lambda v: True):
+        """Returns (value, shared). `shared` is True if no new call was made for this caller."""
+        with self._lock:
+            hit = self._results.get(key)
+            if hit and time.time() - hit[0] < self.ttl:
+                self._results.move_to_end(key)
+                return hit[1], True
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+
+        if not leader:
+            return fut.result(), True
+
+        try:
+            value = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if self.ttl > 0 and cache_if(value):
+                self._results[key] = (time.time(), value)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        fut.set_result(value)
+        return value, False
@@ -1,7 +1,227 @@
+import csv
+import hashlib
+import json
+import os
 import re
+import threading
+from collections import deque
 
-def is_valid_ticker(ticker: str) -> bool:
-    return bool(re.fullmatch(r"[A-Z]{1,5}", ticker)) and ticker not in {"CEO", "ETF", "US", "I"}
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SYMBOLS_CSV = os.path.join(DATA_DIR, "symbols.csv")
+UNIVERSE_INDEX = os.path.join(DATA_DIR, "universe.json")
 
-def clean_tickers(tickers):
-    return [t for t in tickers if is_valid_ticker(t)]
\ No newline at end of file
+STOP_WORDS = {"CEO", "ETF", "US", "I"}
+
+# Real symbols that are also everyday words or abbreviations in headlines;
+# they only count as mentions via a $cashtag or the company name
+AMBIGUOUS_BARE = {
+    "A", "C", "D", "F", "O", "T", "U", "V", "W", "X", "AI", "ON", "NOW", "LOW",
+    "MA", "DE", "SO", "PM", "CAT", "MO", "MET", "DOW", "ICE", "NET", "LI", "EL",
+    "ARM", "HOOD", "DASH", "SNOW", "TEAM", "HUM", "BB", "AA", "DD", "GE", "ALL",
+}
+
+_BARE_RE = re.compile(r"(?<![\w$])[A-Z]{1,5}(?:\.[A-Z])?(?![\w])")
+
+
+def _build_automaton(patterns):
+    """Aho-Corasick goto/fail/output tables for (pattern, symbol) pairs."""
+    goto, out = [{}], [[]]
+    for pattern, symbol in patterns:
+        node = 0
+        for ch in pattern:
+            nxt = goto[node].get(ch)
+            if nxt is None:
+                goto.append({})
+                out.append([])
+                nxt = len(goto) - 1
+                goto[node][ch] = nxt
+            node = nxt
+        out[node].append([symbol, len(pattern)])
+
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        r = queue.popleft()
+        for ch, s in goto[r].items():
+            queue.append(s)
+            f = fail[r]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[s] = goto[f].get(ch, 0)
+            out[s] = out[s] + out[fail[s]]
+    return goto, fail, out
+
+
+class TickerUniverse:
+    """
+    Known symbols (hashed set for O(1) membership) plus an Aho-Corasick matcher
+    that finds company names and $cashtags in text in a single pass.
+    """
+
+    def __init__(self, symbols, goto, fail, out):
+        self.symbols = frozenset(symbols)
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def __contains__(self, symbol):
+        return symbol in self.symbols
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _match_names(self, text):
+        lowered = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        spans = []
+        node = 0
+        for i, ch in enumerate(lowered):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for symbol, length in out[node]:
+                start = i - length + 1
+                if start > 0 and lowered[start - 1].isalnum():
+                    continue
+                if i + 1 < len(lowered) and lowered[i + 1].isalnum():
+                    continue
+                spans.append((start, i + 1, symbol))
+        # Longest match wins where names overlap ("ford motor" over "ford")
+        spans.sort(key=lambda s: (s[0], s[0] - s[1]))
+        found, end = [], -1
+        for start, stop, symbol in spans:
+            if start >= end:
+                found.append((start, symbol))
+                end = stop
+        return found
+
+    def extract_mentions(self, text):
+        """Symbols mentioned by name, $cashtag or unambiguous bare ticker, in text order."""
+        found = self._match_names(text)
+        for m in _BARE_RE.finditer(text):
+            t = m.group()
+            if t in self.symbols and t not in AMBIGUOUS_BARE:
+                found.append((m.start(), t))
+        found.sort()
+        return [symbol for _, symbol in found]
+
+    def to_json(self, source_hash):
+        return {
+            "source_hash": source_hash,
+            "symbols": sorted(self.symbols),
+            "goto": self._goto,
+            "fail": self._fail,
+            "out": self._out,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["symbols"], data["goto"], data["fail"], data["out"])
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds from (symbol, name, aliases) rows."""
+        symbols, patterns = [], []
+        for symbol, _name, aliases in rows:
+            symbol = symbol.strip().upper()
+            if not symbol:
+                continue
+            symbols.append(symbol)
+            patterns.append(("$" + symbol.lower(), symbol))
+            for alias in (aliases or "").split("|"):
+                alias = alias.strip().lower()
+                if alias:
+                    patterns.append((alias, symbol))
+        return cls(symbols, *_build_automaton(patterns))
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(r["symbol"], r.get("name", ""), r.get("aliases", "")) for r in csv.DictReader(f)]
+
+def _read_nasdaq_directory(path):
+    # nasdaqlisted.txt / otherlisted.txt from nasdaqtrader.com: pipe-separated,
+    # with a trailing "File Creation Time" line
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        header = f.readline().strip().split("|")
+        col = header.index("Symbol") if "Symbol" in header else header.index("ACT Symbol")
+        name_col = header.index("Security Name")
+        test_col = header.index("Test Issue") if "Test Issue" in header else None
+        for line in f:
+            parts = line.rstrip("\n").split("|")
+            if len(parts) <= max(col, name_col) or line.startswith("File Creation Time"):
+                continue
+            if test_col is not None and parts[test_col] == "Y":
+                continue
+            rows.append((parts[col].replace("$", "-"), parts[name_col], ""))
+    return rows
+
+def build_index(csv_path=SYMBOLS_CSV, out_path=UNIVERSE_INDEX, extra_sources=()):
+    """
+    Builds the universe from the bundled CSV (plus optional NASDAQ symbol
+    directory files for full coverage) and writes the compact prebuilt index.
+    """
+    rows = _read_csv(csv_path)
+    known = {r[0] for r in rows}
+    for path in extra_sources:
+        rows += [r for r in _read_nasdaq_directory(path) if r[0] not in known]
+    universe = TickerUniverse.from_rows(rows)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(universe.to_json(_file_hash(csv_path)), f, separators=(",", ":"))
+    return universe
+
+_universe = None
+_universe_loaded = False
+_universe_lock = threading.Lock()
+
+def get_universe():
+    """The prebuilt index if it matches the bundled CSV, else one built in memory; None without data."""
+    global _universe, _universe_loaded
+    with _universe_lock:
+        if _universe_loaded:
+            return _universe
+        _universe_loaded = True
+        try:
+            source_hash = _file_hash(SYMBOLS_CSV)
+        except OSError:
+            return None
+        try:
+            with open(UNIVERSE_INDEX, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("source_hash") == source_hash:
+                _universe = TickerUniverse.from_json(data)
+                return _universe
+        except (OSError, ValueError, KeyError):
+            pass
+        _universe = TickerUniverse.from_rows(_read_csv(SYMBOLS_CSV))
+        return _universe
+
+def is_valid_ticker(ticker: str, strict: bool = True) -> bool:
+    """
+    strict: must be a known symbol when the universe index is available.
+    Otherwise any 1-5 upper-case letters that are not a stop word.
+    """
+    if ticker in STOP_WORDS:
+        return False
+    universe = get_universe() if strict else None
+    if universe is not None:
+        return ticker in universe
+    return bool(re.fullmatch(r"[A-Z]{1,5}", ticker))
+
+def clean_tickers(tickers, strict=True):
+    return [t for t in tickers if is_valid_ticker(t, strict)]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Prebuild the ticker universe index.")
+    ap.add_argument("sources", nargs="*", help="optional nasdaqlisted.txt / otherlisted.txt files")
+    args = ap.parse_args()
+    u = build_index(extra_sources=args.sources)
+    print(f"Wrote {UNIVERSE_INDEX} with {len(u)} symbols")
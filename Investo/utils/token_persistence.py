@@ -1,31 +1,126 @@
-import json
+import atexit
 import os
+import threading
+
+from utils.jsonfile import read_json, write_json_atomic
 
 DATA_PATH = os.path.expanduser("~/investment_news_bot/token_data.json")
+DEFAULT_BUDGET = 1000
 
-def load_token_data():
-    if os.path.exists(DATA_PATH):
-        with open(DATA_PATH, "r") as f:
-            try:
-                data = json.load(f)
-                return data.get("tokens_used", 0), data.get("primary_budget", 1000)
-            except Exception:
-                return 0, 1000
-    return 0, 1000
-
-def save_token_data(tokens_used, primary_budget):
-    with open(DATA_PATH, "w") as f:
-        json.dump({
-            "tokens_used": tokens_used,
-            "primary_budget": primary_budget
-        }, f)
-
-def load_primary_budget():
-    if os.path.exists(DATA_PATH):
-        with open(DATA_PATH, "r") as f:
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class TokenLedger:
+    """
+    Token usage kept in memory and written behind to DATA_PATH.
+    Budget edits made to the file by hand are picked up by watching its mtime,
+    and totals per chat and per mode (summary/ticker) are kept alongside.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DATA_PATH  # resolved here so DATA_PATH can be repointed (bench, tools)
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._timer = None
+        data = read_json(self.path)
+        self.tokens_used = data.get("tokens_used", 0)
+        self.primary_budget = data.get("primary_budget", DEFAULT_BUDGET)
+        self.tokens_saved = data.get("tokens_saved", 0)
+        self.by_chat = {str(k): v for k, v in (data.get("by_chat") or {}).items()}
+        self.by_mode = dict(data.get("by_mode") or {})
+        self._mtime = _mtime(self.path)
+
+    def refresh_budget(self):
+        """Re-reads primary_budget only if the file changed since we last saw it."""
+        mtime = _mtime(self.path)
+        with self._lock:
+            if mtime is not None and mtime != self._mtime:
+                self._mtime = mtime
+                self.primary_budget = read_json(self.path).get("primary_budget", self.primary_budget)
+            return self.primary_budget
+
+    def record(self, tokens, chat_id=None, mode=None, saved=False):
+        if not tokens:
+            return
+        with self._lock:
+            if saved:
+                self.tokens_saved += tokens
+            else:
+                self.tokens_used += tokens
+                if chat_id is not None:
+                    key = str(chat_id)
+                    self.by_chat[key] = self.by_chat.get(key, 0) + tokens
+                if mode is not None:
+                    self.by_mode[mode] = self.by_mode.get(mode, 0) + tokens
+            self._dirty = True
+
+    def mirror(self, mapping):
+        """
+        Copies the totals into `mapping` (bot_data) under the lock, so a slower
+        writer can never leave older totals behind. Returns (used, budget).
+        """
+        with self._lock:
+            mapping["tokens_used"] = self.tokens_used
+            mapping["primary_budget"] = self.primary_budget
+            mapping["tokens_saved"] = self.tokens_saved
+            return self.tokens_used, self.primary_budget
+
+    def chat_total(self, chat_id):
+        with self._lock:
+            return self.by_chat.get(str(chat_id), 0)
+
+    def mode_total(self, mode):
+        with self._lock:
+            return self.by_mode.get(mode, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "tokens_used": self.tokens_used,
+                "primary_budget": self.primary_budget,
+                "tokens_saved": self.tokens_saved,
+                "by_chat": dict(self.by_chat),
+                "by_mode": dict(self.by_mode),
+            }
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return False
+            self.refresh_budget()  # don't overwrite a budget edited since the last check
+            write_json_atomic(self.path, self.snapshot())
+            self._mtime = _mtime(self.path)
+            self._dirty = False
+            return True
+
+    def start(self, interval=30):
+        """Flushes every `interval` seconds in a daemon thread, and once more at exit."""
+        def loop():
             try:
-                data = json.load(f)
-                return data.get("primary_budget", 1000)
-            except Exception:
-                return 1000
-    return 1000
\ No newline at end of file
+                self.flush()
+            except Exception as e:
+                print("Token ledger flush failed:", e)
+            self._timer = threading.Timer(interval, loop)
+            self._timer.daemon = True
+            self._timer.start()
+
+        if self._timer is None:
+            atexit.register(self.flush)
+            self._timer = threading.Timer(interval, loop)
+            self._timer.daemon = True
+            self._timer.start()
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+def get_ledger():
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = TokenLedger()
+        return _ledger
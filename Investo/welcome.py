@@ -9,6 +9,11 @@ HOTSPOT_PASSWORD = "investo1234"
 ENV_FILE = "/home/pi/investo/.env"
 WPA_SUPPLICANT_PATH = "/etc/wpa_supplicant/wpa_supplicant.conf"
 SYSTEMD_SERVICE = "investo.service"
+PAIRING_TIMEOUT = 300
+LONG_POLL_SECONDS = 25
+# The bot serves Prometheus metrics on localhost; /metrics here proxies to it
+# for local scrapers only, since this app listens on every interface
+BOT_METRICS_URL = os.getenv("BOT_METRICS_URL", "http://127.0.0.1:9108/metrics")
 
 app = Flask(__name__)
 load_dotenv(ENV_FILE) if os.path.exists(ENV_FILE) else None
@@ -207,21 +212,24 @@ network={{
     os.system("sudo chown root:root " + WPA_SUPPLICANT_PATH)
     print("Wrote wpa_supplicant config")
 
-def poll_telegram_for_chat_id(bot_token, timeout=300, poll_interval=2):
+def poll_telegram_for_chat_id(bot_token, timeout=300, poll_interval=2, long_poll=LONG_POLL_SECONDS):
+    # Long polling: Telegram holds each request open until an update arrives
+    # (or `long_poll` seconds pass), and `offset` acknowledges what we've read
     url = f"https://api.telegram.org/bot{bot_token}/getUpdates"
     deadline = time.time() + timeout
-    last_update_id = None
+    offset = None
     print("Waiting for /start in Telegram...")
     while time.time() < deadline:
+        wait = int(max(1, min(long_poll, deadline - time.time())))
+        params = {"timeout": wait, "allowed_updates": '["message"]'}
+        if offset is not None:
+            params["offset"] = offset
         try:
-            r = requests.get(url, timeout=10).json()
+            r = requests.get(url, params=params, timeout=wait + 10).json()
             if not r.get("ok"):
                 time.sleep(poll_interval); continue
             for u in r.get("result", []):
-                uid = u.get("update_id")
-                if last_update_id is not None and uid <= last_update_id:
-                    continue
-                last_update_id = uid
+                offset = u.get("update_id") + 1
                 msg = u.get("message") or u.get("edited_message") or {}
                 text = msg.get("text","")
                 chat = msg.get("chat",{})
@@ -231,9 +239,36 @@ def poll_telegram_for_chat_id(bot_token, timeout=300, poll_interval=2):
                     return chat_id
         except Exception as e:
             print("Telegram poll error:", e)
-        time.sleep(poll_interval)
+            time.sleep(poll_interval)  # only back off on errors; a good poll already waited
     return None
 
+# ---------- Pairing worker ----------
+# token -> {"state": "waiting" | "paired" | "timeout", "chat_id": ...}
+_pairing = {}
+_pairing_lock = threading.Lock()
+
+def _pair(token):
+    cid = poll_telegram_for_chat_id(token, timeout=PAIRING_TIMEOUT)
+    if cid:
+        with open(ENV_FILE, "a") as f:
+            f.write(f"TELEGRAM_CHAT_ID={cid}\n")
+    with _pairing_lock:
+        _pairing[token] = {"state": "paired" if cid else "timeout", "chat_id": cid}
+    if cid:
+        os.system(f"sudo systemctl restart {SYSTEMD_SERVICE}")
+
+def start_pairing(token, retry=False):
+    """
+    Starts the one background pairing worker for `token` unless it is already
+    running (or finished, unless `retry`). Returns the current pairing state.
+    """
+    with _pairing_lock:
+        state = _pairing.get(token)
+        if state is None or (retry and state["state"] == "timeout"):
+            state = _pairing[token] = {"state": "waiting", "chat_id": None}
+            threading.Thread(target=_pair, args=(token,), daemon=True).start()
+        return dict(state)
+
 # ---------- Routes ----------
 @app.route("/", methods=["GET","POST"])
 def index():
@@ -285,11 +320,22 @@ def status():
     if not token:
         return redirect(url_for("index"))
 
-    cid = poll_telegram_for_chat_id(token, timeout=180)
+    # Answered straight from the worker's state; the page refreshes itself
+    pairing = start_pairing(token, retry=request.args.get("retry") == "1")
+    if pairing["state"] == "waiting":
+        return f"""
+        <html><head>{STYLE}</head><body>
+        <header><h2>Investo Setup</h2></header>
+        <div class="container waiting-box">
+          <h3>⏳ Waiting for Telegram</h3>
+          <p>👉 Open Telegram and send <code>/start</code> to your bot.</p>
+          <p>This page checks again every few seconds...</p>
+          <meta http-equiv="refresh" content="5; url=/status">
+        </div>
+        </body></html>
+        """
+    cid = pairing["chat_id"]
     if cid:
-        with open(ENV_FILE, "a") as f:
-            f.write(f"TELEGRAM_CHAT_ID={cid}\n")
-        os.system(f"sudo systemctl restart {SYSTEMD_SERVICE}")
         return f"""
         <html><head>{STYLE}</head><body>
         <header><h2>Investo Setup</h2></header>
@@ -307,11 +353,22 @@ def status():
         <div class="container error-box">
           <h3>⚠️ Pairing timed out</h3>
           <p>Did you send <code>/start</code> to your bot?</p>
+          <p><a href='/status?retry=1'>🔄 Try again</a></p>
           <p><a href='/'>⬅ Back to Setup</a></p>
         </div>
         </body></html>
         """
 
+@app.route("/metrics")
+def metrics():
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return "# metrics are only served to localhost\n", 403, {"Content-Type": "text/plain"}
+    try:
+        r = requests.get(BOT_METRICS_URL, timeout=3)
+        return r.text, r.status_code, {"Content-Type": r.headers.get("Content-Type", "text/plain")}
+    except requests.RequestException:
+        return "# bot metrics endpoint unreachable\n", 503, {"Content-Type": "text/plain"}
+
 # ---------- Hotspot fallback ----------
 def start_hotspot_if_needed():
     try: